@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark log-to-trace alignment on a synthetic long-running thread: the previous
+linear scan that copies the remaining path after every log, against the indexed,
+cursor-based lookup of ExecutionPathProcessor on a ThreadPath.
+
+Usage:
+    python benchmarks/alignment_benchmark.py [--path-length N] [--locations L] [--logs M]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "cov_pred"))
+
+from entity.trace import PathTable, ThreadPath
+from processor.execution_path_processor import ExecutionPathProcessor
+
+
+class SyntheticLog:
+    def __init__(self, file: str, line: str):
+        self.file = file
+        self.line = line
+
+    def get_file(self) -> str:
+        return self.file
+
+    def get_line(self) -> str:
+        return self.line
+
+
+def make_thread(path_length: int, locations: int, logs: int) -> tuple[ThreadPath, list[SyntheticLog]]:
+    """
+    Build one thread executing path_length traces over `locations` distinct lines and
+    `logs` logs taken in order from its traces, so that every log aligns.
+    """
+    random.seed(42)
+    paths = [f"src/main/java/org/example/Worker{i % 50}.java;run@{i}" for i in range(locations)]
+    execution_path = ThreadPath(PathTable(), 1)
+    for order in range(path_length):
+        execution_path.append(random.choice(paths), order)
+    log_positions = sorted(random.sample(range(path_length), logs))
+    application_logs = [SyntheticLog(execution_path.get_file(i), execution_path.get_line(i)) for i in log_positions]
+    return execution_path, application_logs
+
+
+def sliced_alignment(application_logs: list[SyntheticLog], traces: list) -> list[int]:
+    # Alignment as done before the index: linear scan, then a copy of the rest of the path per log
+    positions = []
+    offset = 0
+    for log in application_logs:
+        found = None
+        for index, trace in enumerate(traces):
+            if log.get_file() == trace.get_file() and log.get_line() == trace.get_line():
+                found = index
+                break
+        if found is None:
+            return positions
+        positions.append(offset + found)
+        offset += found + 1
+        traces = traces[found+1:]
+    return positions
+
+
+def indexed_alignment(processor: ExecutionPathProcessor, application_logs: list[SyntheticLog], execution_path: ThreadPath) -> list[int]:
+    positions = []
+    start = 0
+    position_index = execution_path.position_index()
+    for log in application_logs:
+        found = processor.find_log_execution(log, execution_path, start, position_index)
+        if found is None:
+            return positions
+        positions.append(found)
+        start = found + 1
+    return positions
+
+
+def timed(align):
+    start = time.perf_counter()
+    result = align()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark log-to-trace alignment')
+    parser.add_argument('--path-length', type=int, default=200000, help='Traces executed by the thread')
+    parser.add_argument('--locations', type=int, default=5000, help='Distinct (file, line) locations')
+    parser.add_argument('--logs', type=int, default=2000, help='Logs aligned against the thread')
+    args = parser.parse_args()
+
+    execution_path, application_logs = make_thread(args.path_length, args.locations, args.logs)
+    processor = ExecutionPathProcessor(None, None)
+    traces = list(execution_path)
+
+    sliced, sliced_time = timed(lambda: sliced_alignment(application_logs, traces))
+    indexed, indexed_time = timed(lambda: indexed_alignment(processor, application_logs, execution_path))
+    print(f"Path length: {len(execution_path)}, logs: {len(application_logs)}")
+    print(f"Linear scan with copies: {sliced_time:.2f}s")
+    print(f"Indexed with cursor:     {indexed_time:.4f}s (including index build)")
+    print(f"Check thread:            {processor.check_thread(application_logs, execution_path)}")
+    print(f"Identical alignment: {sliced == indexed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark COPY-based trace extraction against the RealDictCursor query path on a
+synthetic registry in a local Postgres database.
+
+The fixture creates the run/trace schemas in the given (empty, throwaway) database,
+fills them with synthetic traces, runs both loaders and drops the schemas again.
+Connection settings other than the database name come from the usual DB_* variables.
+
+Usage:
+    python benchmarks/copy_loading_benchmark.py <fixture_db> [--signatures N] [--traces-per-signature M]
+"""
+
+import argparse
+import io
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "cov_pred"))
+
+REGISTRY = 1
+
+
+def create_fixture(database, signatures: int, traces_per_signature: int, threads: int = 4):
+    """
+    Create the tables read by Database and fill them with one synthetic registry.
+    """
+    random.seed(42)
+    files = [f"src/main/java/org/example/Class{i}.java" for i in range(200)]
+    with database.connection() as conn:
+        with conn.cursor() as cur:
+            for schema in ["run", "trace"]:
+                cur.execute(f"SELECT 1 FROM information_schema.schemata WHERE schema_name = '{schema}'")
+                if cur.fetchone():
+                    raise RuntimeError(f"Schema {schema} already exists; use an empty database for the fixture")
+            cur.execute("CREATE SCHEMA run")
+            cur.execute("CREATE SCHEMA trace")
+            cur.execute("CREATE TABLE run.registry (registry_id INTEGER PRIMARY KEY, commit_id TEXT)")
+            cur.execute("CREATE TABLE trace.trace_in_test (test_trace_id INTEGER PRIMARY KEY, registry_id INTEGER, signature TEXT)")
+            cur.execute("CREATE TABLE trace.trace_in_source (test_trace_id INTEGER, thread_id INTEGER, invoked_order INTEGER, path TEXT)")
+            cur.execute("INSERT INTO run.registry VALUES (%s, 'benchmark')", (REGISTRY,))
+
+            tests = io.StringIO()
+            sources = io.StringIO()
+            for test_trace_id in range(signatures):
+                tests.write(f"{test_trace_id}\t{REGISTRY}\torg/example/Test{test_trace_id};test#\n")
+                for invoked_order in range(traces_per_signature):
+                    file = random.choice(files)
+                    sources.write(f"{test_trace_id}\t{random.randrange(threads)}\t{invoked_order}\t{file};method@{random.randrange(1, 500)}\n")
+            tests.seek(0)
+            sources.seek(0)
+            cur.copy_expert("COPY trace.trace_in_test FROM STDIN", tests)
+            cur.copy_expert("COPY trace.trace_in_source FROM STDIN", sources)
+            cur.execute("CREATE INDEX ON trace.trace_in_source (test_trace_id, invoked_order)")
+        conn.commit()
+
+
+def drop_fixture(database):
+    with database.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("DROP SCHEMA trace CASCADE")
+            cur.execute("DROP SCHEMA run CASCADE")
+        conn.commit()
+
+
+def timed(load):
+    start = time.perf_counter()
+    result = load()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark COPY-based trace extraction')
+    parser.add_argument('fixture_db', help='Name of an empty local database used for the fixture')
+    parser.add_argument('--signatures', type=int, default=1000, help='Number of synthetic tests')
+    parser.add_argument('--traces-per-signature', type=int, default=2000, help='Trace rows per test')
+    args = parser.parse_args()
+
+    os.environ["DB_NAME"] = args.fixture_db
+    from database import Database
+    from manager.trace_manager import TraceManager
+
+    database = Database()
+    create_fixture(database, args.signatures, args.traces_per_signature)
+    try:
+        rows, query_time = timed(lambda: database.get_execution_paths(REGISTRY))
+        columns, copy_time = timed(lambda: database.copy_execution_paths(REGISTRY))
+        print(f"Rows: {len(rows)}")
+        print(f"RealDictCursor fetchall: {query_time:.2f}s")
+        print(f"COPY into typed arrays:  {copy_time:.2f}s")
+        query_rows = [(row['signature'], row['thread_id'], row['invoked_order'], row['path']) for row in rows]
+        copy_rows = [
+            (columns.signatures[columns.signature_ids[i]], columns.thread_ids[i], columns.invoked_orders[i], columns.paths[columns.path_ids[i]])
+            for i in range(len(columns))
+        ]
+        print(f"Identical rows: {query_rows == copy_rows}")
+        del rows, columns, query_rows, copy_rows
+
+        bulk, bulk_time = timed(lambda: TraceManager(database, REGISTRY, "benchmark", load_mode="bulk"))
+        copy, copy_time = timed(lambda: TraceManager(database, REGISTRY, "benchmark", load_mode="copy"))
+        print(f"TraceManager bulk: {bulk_time:.2f}s")
+        print(f"TraceManager copy: {copy_time:.2f}s")
+    finally:
+        drop_fixture(database)
+        database.close_conn()
+
+
+if __name__ == "__main__":
+    main()
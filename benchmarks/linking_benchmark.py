@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark serial against process-pool linking of logs to execution paths on a
+synthetic registry, and check that both produce the same collection.
+
+Exits with a non-zero status if the parallel collection differs from the serial one.
+
+Usage:
+    python benchmarks/linking_benchmark.py [--signatures N] [--threads T] [--path-length P] [--logs L] [--workers W]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "cov_pred"))
+
+from entity.trace import PathTable, ThreadPath
+from processor.execution_path_processor import ExecutionPathProcessor
+from alignment_benchmark import SyntheticLog
+
+
+class SyntheticTraceManager:
+    def __init__(self, execution_paths: dict[str, dict[str, ThreadPath]], path_table: PathTable):
+        self.execution_paths = execution_paths
+        self.path_table = path_table
+
+    def get_signatures(self) -> list[str]:
+        return list(self.execution_paths.keys())
+
+    def get_traces_by_signature(self, signature: str) -> dict[str, ThreadPath]:
+        return self.execution_paths.get(signature, {})
+
+    def get_traces_by_thread(self, signature: str, thread_num: str) -> ThreadPath:
+        return self.execution_paths[signature][thread_num]
+
+
+class SyntheticApplicationLogManager:
+    def __init__(self, application_logs: dict[str, dict[str, list[SyntheticLog]]]):
+        self.application_logs = application_logs
+
+    def get_logs_by_signature(self, signature: str) -> dict[str, list[SyntheticLog]]:
+        return self.application_logs.get(signature, {})
+
+
+def make_registry(signatures: int, threads: int, path_length: int, logs: int) -> tuple[SyntheticTraceManager, SyntheticApplicationLogManager]:
+    """
+    Build signatures whose log threads are drawn from one of their trace threads, plus
+    some logs at locations the thread never reaches so that part of them do not match.
+    """
+    random.seed(42)
+    path_table = PathTable()
+    paths = [f"src/main/java/org/example/Class{i % 100}.java;method@{i}" for i in range(2000)]
+    execution_paths = {}
+    application_logs = {}
+    for signature_count in range(signatures):
+        signature = f"org/example/Test{signature_count};test#"
+        execution_paths[signature] = {}
+        application_logs[signature] = {}
+        for thread_id in range(threads):
+            execution_path = ThreadPath(path_table, thread_id)
+            for order in range(path_length):
+                execution_path.append(random.choice(paths), order)
+            execution_paths[signature][execution_path.thread_num] = execution_path
+            log_positions = sorted(random.sample(range(path_length), logs))
+            thread_logs = [SyntheticLog(execution_path.get_file(i), execution_path.get_line(i)) for i in log_positions]
+            if random.random() < 0.2:
+                thread_logs.append(SyntheticLog("src/main/java/org/example/Missing.java", "1"))
+            application_logs[signature][f"worker-{thread_id}"] = thread_logs
+    return SyntheticTraceManager(execution_paths, path_table), SyntheticApplicationLogManager(application_logs)
+
+
+def describe(collection: dict) -> dict:
+    """
+    Reduce a collection to comparable values: per log pair, the thread and bounds of its segment.
+    """
+    return {
+        signature: {
+            thread_id: [(id(previous_log), id(log), segment.thread_num, segment.start, segment.end) for (previous_log, log), segment in segments.items()]
+            for thread_id, segments in threads.items()
+        }
+        for signature, threads in collection.items()
+    }
+
+
+def link(trace_manager, application_log_manager, workers: int) -> tuple[dict, int, float]:
+    start = time.perf_counter()
+    processor = ExecutionPathProcessor(trace_manager, application_log_manager, workers=workers)
+    collection = processor.link_logs_to_execution_path()
+    return collection, processor.matched, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark parallel linking')
+    parser.add_argument('--signatures', type=int, default=400, help='Number of synthetic tests')
+    parser.add_argument('--threads', type=int, default=8, help='Threads per test')
+    parser.add_argument('--path-length', type=int, default=5000, help='Traces per thread')
+    parser.add_argument('--logs', type=int, default=50, help='Logs per thread')
+    parser.add_argument('--workers', type=int, default=4, help='Linking processes')
+    args = parser.parse_args()
+
+    trace_manager, application_log_manager = make_registry(args.signatures, args.threads, args.path_length, args.logs)
+    serial, serial_matched, serial_time = link(trace_manager, application_log_manager, 1)
+    parallel, parallel_matched, parallel_time = link(trace_manager, application_log_manager, args.workers)
+    identical = describe(serial) == describe(parallel) and serial_matched == parallel_matched
+    print(f"Matched threads: {serial_matched}")
+    print(f"Serial:              {serial_time:.2f}s")
+    print(f"{args.workers} workers:           {parallel_time:.2f}s")
+    print(f"Identical collection: {identical}")
+    if not identical:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Measure log parsing throughput in lines per second: the single compiled regex of
+LogParser against separate scans for level, thread, class and line, as ApplicationLog
+did before. Statements are synthetic, or read from a snapshot with --snapshot.
+
+Run from the repository root, where settings/log_formats.json is found.
+
+Usage:
+    python benchmarks/log_parser_benchmark.py <project> [--lines N] [--snapshot DIR]
+"""
+
+import argparse
+import itertools
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "cov_pred"))
+
+from utils.log_parser import LogParser
+
+LOG_LEVELS = ['INFO', 'DEBUG', 'WARN', 'ERROR']
+LOCATION_PATTERNS = {
+    "zookeeper": r'[A-Za-z0-9_$]+@\d+',
+    "druid": r'[A-Za-z0-9_$]+@\d+',
+    "activemq": r'\s*[A-Za-z0-9_$]+\s*@\d+'
+}
+
+
+def synthetic_statements(project: str, lines: int) -> list[str]:
+    random.seed(42)
+    statements = []
+    for i in range(lines):
+        level = random.choice(LOG_LEVELS)
+        thread = random.choice(["main", "SyncThread:0", f"pool-1-thread-{i % 16}", "NIOWorkerThread-3"])
+        location = f"{random.choice(['QuorumPeer', 'Broker', 'Server$Handler', 'TransportConnection'])}@{random.randrange(1, 2000)}"
+        message = "processed request " + " ".join(str(random.randrange(10 ** 6)) for _ in range(random.randrange(1, 12)))
+        if project == "zookeeper":
+            statements.append(f"2024-01-01 00:00:00,{i % 1000:03d} [myid:1] - {level:<5} [{thread}:{location}] - {message}")
+        else:
+            statements.append(f"2024-01-01T00:00:00,{i % 1000:03d} [{thread}] {level:<5} {location} - {message}")
+    return statements
+
+
+def snapshot_statements(snapshot_dir: str, lines: int) -> list[str]:
+    from snapshot import Snapshot
+    snapshot = Snapshot(snapshot_dir)
+    return [log["statement"] for log in itertools.islice(snapshot.stream_logs(snapshot.registry), lines)]
+
+
+def separate_scans(project: str, statement: str) -> tuple:
+    # Previous approach: find-based thread extraction, then one search each for the class and the line
+    thread_id = None
+    for level in LOG_LEVELS:
+        level_index = statement.find(level)
+        if level_index == -1:
+            continue
+        if project == "zookeeper":
+            after_level = statement[level_index + len(level):]
+            bracket_start = after_level.find('[')
+            bracket_content_end = after_level.find('@', bracket_start)
+            if bracket_start != -1 and bracket_content_end != -1:
+                thread_id = "".join(after_level[bracket_start + 1:bracket_content_end].split(':')[:-1])
+        else:
+            before_level = statement[:level_index]
+            bracket_start = before_level.find('[')
+            bracket_content_end = before_level.rfind(']')
+            if bracket_start != -1 and bracket_content_end != -1:
+                thread_id = before_level[bracket_start + 1:bracket_content_end].strip()
+        break
+    line_match = re.search(LOCATION_PATTERNS[project], statement)
+    class_match = re.search(LOCATION_PATTERNS[project], statement)
+    line = line_match.group(0).split('@')[-1] if line_match else None
+    class_name = class_match.group(0).split('@')[0].strip().replace("$", ".") if class_match else None
+    return thread_id, class_name, line
+
+
+def throughput(parse, statements: list[str]) -> float:
+    start = time.perf_counter()
+    parse(statements)
+    return len(statements) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark log parsing throughput')
+    parser.add_argument('project', choices=list(LOCATION_PATTERNS.keys()), help='Project name')
+    parser.add_argument('--lines', type=int, default=200000, help='Number of statements')
+    parser.add_argument('--snapshot', help='Read statements from a snapshot directory instead of generating them')
+    args = parser.parse_args()
+
+    statements = snapshot_statements(args.snapshot, args.lines) if args.snapshot else synthetic_statements(args.project, args.lines)
+    log_parser = LogParser.for_project(args.project)
+    separate = throughput(lambda lines: [separate_scans(args.project, line) for line in lines], statements)
+    combined = throughput(log_parser.parse_all, statements)
+    print(f"Statements: {len(statements)}")
+    print(f"Separate scans:  {separate:,.0f} lines/s")
+    print(f"Compiled parser: {combined:,.0f} lines/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Compare the per-signature (N+1 queries), bulk (single query) and concurrent
+(per-signature queries on pooled connections) trace loading modes of
+TraceManager on one registry.
+
+Usage:
+    python benchmarks/trace_loading_benchmark.py <project> <registry> [--workers N]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "cov_pred"))
+
+from database import Database
+from manager.trace_manager import TraceManager
+
+
+def load(database: Database, project: str, registry: str, load_mode: str, workers: int = 4) -> tuple[TraceManager, float]:
+    """
+    Load a registry with the given load mode.
+
+    Returns:
+        Tuple of (trace manager, elapsed seconds)
+    """
+    start = time.perf_counter()
+    trace_manager = TraceManager(database, registry, project, load_mode=load_mode, workers=workers)
+    return trace_manager, time.perf_counter() - start
+
+
+def same_execution_paths(trace_manager1: TraceManager, trace_manager2: TraceManager) -> bool:
+    """
+    Check that two trace managers hold the same traces for every signature and thread.
+    """
+    for signature in trace_manager1.get_signatures():
+        threads1 = trace_manager1.get_traces_by_signature(signature)
+        threads2 = trace_manager2.get_traces_by_signature(signature)
+        if list(threads1.keys()) != list(threads2.keys()):
+            return False
+        for thread_num, traces in threads1.items():
+            if not trace_manager1.check_equal(traces, threads2[thread_num]):
+                return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark trace loading modes')
+    parser.add_argument('project', help='Project name')
+    parser.add_argument('registry', help='Registry id')
+    parser.add_argument('--workers', type=int, default=4, help='Parallel queries for the concurrent mode')
+    args = parser.parse_args()
+
+    database = Database(pool_size=args.workers)
+    per_signature, per_signature_time = load(database, args.project, args.registry, "signature")
+    bulk, bulk_time = load(database, args.project, args.registry, "bulk")
+    concurrent, concurrent_time = load(database, args.project, args.registry, "concurrent", args.workers)
+    database.close_conn()
+
+    trace_count = sum(
+        len(traces)
+        for signature in bulk.get_signatures()
+        for traces in bulk.get_traces_by_signature(signature).values()
+    )
+    print(f"Signatures: {len(bulk.get_signatures())}, traces: {trace_count}")
+    print(f"signature (N+1 queries): {per_signature_time:.2f}s")
+    print(f"bulk (1 query):          {bulk_time:.2f}s")
+    print(f"concurrent ({args.workers} workers):  {concurrent_time:.2f}s")
+    if bulk_time > 0:
+        print(f"Bulk speedup: {per_signature_time / bulk_time:.2f}x")
+    if concurrent_time > 0:
+        print(f"Concurrent speedup: {per_signature_time / concurrent_time:.2f}x")
+    print(f"Identical execution paths (bulk): {same_execution_paths(per_signature, bulk)}")
+    print(f"Identical execution paths (concurrent): {same_execution_paths(per_signature, concurrent)}")
+
+
+if __name__ == "__main__":
+    main()
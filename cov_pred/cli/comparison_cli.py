@@ -8,6 +8,8 @@ def setup_compare_parser(subparsers):
     parser.add_argument('project', help='Project name')
     parser.add_argument('registry', help='Registry path')
     parser.add_argument('level', choices=['method', 'line', 'bulk'], help='Log level')
+    parser.add_argument('--link-workers', type=int, default=1, help='Number of processes linking logs to execution paths')
+    parser.add_argument('--snapshot', help='Load the registry from a snapshot directory instead of the database')
     parser.set_defaults(func=handle_compare)
 
 def handle_compare(args):
@@ -15,20 +17,17 @@ def handle_compare(args):
         raise ValueError(f"mode is required")
 
     if args.mode == 'prepare_logcoco':
-        controller = LogcocoController(args.project, args.registry)
+        controller = LogcocoController(args.project, args.registry, args.snapshot)
         controller.prepare_log_data(args.level)
     
     if args.mode == 'static_analysis':
-        module = 'module'
-        if args.project == "zookeeper":
-            module = "zookeeper-server"
-        controller = StaticAnalysisController(args.project, args.registry, module)
+        controller = StaticAnalysisController(args.project, args.registry, args.snapshot, args.link_workers)
         controller.analyze()
     
     if args.mode == 'target':
         if args.level == 'line':
-            controller = StaticAnalysisController(args.project, args.registry)
+            controller = StaticAnalysisController(args.project, args.registry, args.snapshot, args.link_workers)
             controller.identify_log_containing_methods_line()
         elif args.level == 'method':
-            controller = StaticAnalysisController(args.project, args.registry)
+            controller = StaticAnalysisController(args.project, args.registry, args.snapshot, args.link_workers)
             controller.identify_log_containing_methods()
\ No newline at end of file
@@ -6,12 +6,13 @@ def setup_evaluate_parser(subparsers):
                        help='Format mode')
     parser.add_argument('project', help='Project name')
     parser.add_argument('registry', help='Registry path')
+    parser.add_argument('--snapshot', help='Load the registry from a snapshot directory instead of the database')
     parser.set_defaults(func=handle_evaluate)
 
 def handle_evaluate(args):
     if args.mode not in ['line', 'bulk_line', 'method', 'logcoco_method', 'logcoco_line', 'static_line', 'static_method']:
         raise ValueError(f"{args.mode} mode is not supported")
-    controller = EvaluationController(args.project, args.registry)
+    controller = EvaluationController(args.project, args.registry, args.snapshot)
 
     if args.mode == 'line':
         controller.evaluate()
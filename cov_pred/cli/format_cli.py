@@ -2,18 +2,28 @@ from controller.format_controller import FormatController
 
 def setup_format_parser(subparsers):
     parser = subparsers.add_parser('format', help='Format data for training/validation')
-    parser.add_argument('mode', choices=['train', 'validate', 'train_method_level', 'validate_method_level', 'train_bulk_line_level', 'validate_bulk_line_level'],
-                       help='Format mode')
+    parser.add_argument('mode', choices=['train', 'validate', 'train_method_level', 'validate_method_level', 'train_bulk_line_level', 'validate_bulk_line_level', 'all'],
+                       help='Format mode; all writes the training data, validation requests and oracles of every level from one load')
     parser.add_argument('project', help='Project name')
     parser.add_argument('registry', help='Registry path')
     parser.add_argument('--model', help='Model name (required for validate modes)')
+    parser.add_argument('--load-mode', choices=['signature', 'bulk', 'concurrent', 'copy', 'lazy'], default='signature',
+                       help='Load traces with one query per signature, a single query per registry, concurrent per-signature queries, a single COPY per registry, or per signature on first use')
+    parser.add_argument('--trace-cache-size', type=int, default=5000000, help='Traces kept in memory by the lazy load mode')
+    parser.add_argument('--compress-runs', action='store_true', help='Store consecutive repeats of a trace once with a count')
+    parser.add_argument('--workers', type=int, default=4, help='Number of pooled database connections, i.e. parallel queries of the concurrent load mode')
+    parser.add_argument('--link-workers', type=int, default=1, help='Number of processes linking logs to execution paths')
+    parser.add_argument('--format-workers', type=int, default=1, help='Number of processes formatting training pairs; the output is the same as with one')
+    parser.add_argument('--token-budget', type=int, default=8192, help='Split bulk line-level requests whose log statements exceed this many tokens into windows (0 to never split)')
+    parser.add_argument('--compression', choices=['gzip', 'zstd'], help='Compress the written JSONL files, e.g. for archiving (fine-tuning and batch requests need them uncompressed)')
+    parser.add_argument('--snapshot', help='Load the registry from a snapshot directory instead of the database')
     parser.set_defaults(func=handle_format)
 
 def handle_format(args):
-    if args.mode in ['validate', 'validate_method_level'] and not args.model:
+    if args.mode in ['validate', 'validate_method_level', 'all'] and not args.model:
         raise ValueError(f"--model is required for {args.mode} mode")
     
-    controller = FormatController(args.project, args.registry)
+    controller = FormatController(args.project, args.registry, load_mode=args.load_mode, workers=args.workers, snapshot=args.snapshot, link_workers=args.link_workers, trace_cache_size=args.trace_cache_size, compress_runs=args.compress_runs, compression=args.compression, format_workers=args.format_workers, token_budget=args.token_budget)
     controller.setup()
     
     if args.mode == 'train':
@@ -36,4 +46,6 @@ def handle_format(args):
     elif args.mode == 'validate_bulk_line_level':
         controller.setup_bulk_line_level()
         controller.format_for_validation(args.model)
-        controller.make_validation_oracle()
\ No newline at end of file
+        controller.make_validation_oracle()
+    elif args.mode == 'all':
+        controller.format_all(args.model)
\ No newline at end of file
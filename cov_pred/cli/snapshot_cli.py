@@ -0,0 +1,12 @@
+from controller.snapshot_controller import SnapshotController
+
+def setup_snapshot_parser(subparsers):
+    parser = subparsers.add_parser('snapshot', help='Export a registry to an offline snapshot')
+    parser.add_argument('project', help='Project name')
+    parser.add_argument('registry', help='Registry path')
+    parser.add_argument('--output', help='Snapshot directory (default: output/{project}_{registry}/snapshot)')
+    parser.set_defaults(func=handle_snapshot)
+
+def handle_snapshot(args):
+    controller = SnapshotController(args.project, args.registry)
+    controller.export(args.output)
@@ -1,12 +1,13 @@
 from processor.evaluation_processor import EvaluationProcessor
 from utils.git import Git
 from utils.java_util import extract_empty_and_comment_lines
-from database import Database
+from database import open_database
 
 class EvaluationController:
-    def __init__(self, project: str, registry: str):
+    def __init__(self, project: str, registry: str, snapshot: str = None):
         self.project = project
         self.registry = registry
+        self.snapshot = snapshot
         self.empty_and_comment_lines = extract_empty_and_comment_lines(f"./repos/{self.project}")
         self.evaluation_processor = EvaluationProcessor(self.project, self.registry, self.empty_and_comment_lines)
 
@@ -29,7 +30,7 @@ class EvaluationController:
         self.evaluation_processor.static_method_level_evaluate()
     
     def logcoco_method_level_evaluate(self):
-        db = Database()
+        db = open_database(self.snapshot)
         git = Git(self.project, self.registry, "./repos", db)
         git.clone_or_checkout_commit()
         self.evaluation_processor.logcoco_method_level_evaluate()
\ No newline at end of file
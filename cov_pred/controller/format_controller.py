@@ -1,50 +1,90 @@
 from processor.format_processor import FormatProcessor
 from processor.method_level_format_processor import MethodLevelFormatProcessor
 from processor.bulk_format_processor import BulkFormatProcessor
-from database import Database
+from database import open_database
 from utils.java_util import extract_java_classes, extract_empty_and_comment_lines, extract_all_class_and_method_info
 from utils.git import Git
 from manager.trace_manager import TraceManager
 from manager.application_log_manager import ApplicationLogManager
 from processor.execution_path_processor import ExecutionPathProcessor
 from utils.gpt import GPT
+from utils.fan_out import fan_out
 
 import os
 import json
 
 class FormatController:
-    def __init__(self, project, registry):
+    def __init__(self, project, registry, load_mode="signature", workers=4, snapshot=None, link_workers=1, trace_cache_size=5000000, compress_runs=False, compression=None, format_workers=1, token_budget=8192):
         self.project = project
         self.registry = registry
-        self.database = Database()
+        self.load_mode = load_mode
+        self.workers = workers
+        self.link_workers = link_workers
+        self.trace_cache_size = trace_cache_size
+        self.compress_runs = compress_runs
+        self.compression = compression
+        self.format_workers = format_workers
+        self.token_budget = token_budget
+        # One pooled connection per loading worker
+        self.database = open_database(snapshot, pool_size=workers)
 
     def setup(self):
         git = Git(self.project, self.registry, "./repos", self.database)
         git.clone_or_checkout_commit()
         self.class_to_path = extract_java_classes(f"./repos/{self.project}")
         self.empty_and_comment_lines = extract_empty_and_comment_lines(f"./repos/{self.project}")
-        self.trace_manager = TraceManager(self.database, self.registry, self.project)
+        self.trace_manager = TraceManager(self.database, self.registry, self.project, load_mode=self.load_mode, workers=self.workers, cache_size=self.trace_cache_size, compress_runs=self.compress_runs)
         self.application_log_manager = ApplicationLogManager(self.database, self.registry, self.project, self.class_to_path)
         self.signatures_including_logs = self.application_log_manager.get_signatures_including_logs()
-        self.execution_path_processor = ExecutionPathProcessor(self.trace_manager, self.application_log_manager)
-        self.collection = self.execution_path_processor.link_logs_to_execution_path()
+        self.execution_path_processor = ExecutionPathProcessor(self.trace_manager, self.application_log_manager, workers=self.link_workers)
         OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
         self.gpt = GPT(OPENAI_API_KEY)
     
     def setup_line_level(self):
-        self.format_processor = FormatProcessor(self.project, self.registry, self.signatures_including_logs, self.gpt, self.empty_and_comment_lines)
+        self.format_processor = self.line_level_processor()
 
     def setup_method_level(self):
-        self.format_processor = MethodLevelFormatProcessor(self.project, self.registry, self.signatures_including_logs, self.gpt, extract_all_class_and_method_info(f"./repos/{self.project}"), test_percentage=0.2, log_count_threshold=1)
+        self.format_processor = self.method_level_processor()
 
     def setup_bulk_line_level(self):
-        self.format_processor = BulkFormatProcessor(self.project, self.registry, self.signatures_including_logs, self.gpt, self.empty_and_comment_lines, self.application_log_manager, self.trace_manager, test_percentage=0.2, log_count_threshold=1)
+        self.format_processor = self.bulk_line_level_processor()
+
+    def line_level_processor(self) -> FormatProcessor:
+        return FormatProcessor(self.project, self.registry, self.signatures_including_logs, self.gpt, self.empty_and_comment_lines, compression=self.compression, workers=self.format_workers)
+
+    def method_level_processor(self) -> MethodLevelFormatProcessor:
+        return MethodLevelFormatProcessor(self.project, self.registry, self.signatures_including_logs, self.gpt, extract_all_class_and_method_info(f"./repos/{self.project}"), test_percentage=0.2, log_count_threshold=1, compression=self.compression, workers=self.format_workers)
+
+    def bulk_line_level_processor(self) -> BulkFormatProcessor:
+        return BulkFormatProcessor(self.project, self.registry, self.signatures_including_logs, self.gpt, self.empty_and_comment_lines, self.application_log_manager, self.trace_manager, test_percentage=0.2, log_count_threshold=1, compression=self.compression, token_budget=self.token_budget or None)
 
     def format_for_training(self) -> dict:
-        self.format_processor.format_for_training(self.collection)
+        # Only the signatures whose links end up in the training data are linked, one at a time
+        collection = self.execution_path_processor.iter_links(self.format_processor.signatures_to_link())
+        self.format_processor.format_for_training(collection)
     
     def format_for_validation(self, model):
         self.format_processor.format_for_validation(self.application_log_manager, model)
     
     def make_validation_oracle(self):
-        self.format_processor.make_validation_oracle(self.trace_manager)
\ No newline at end of file
+        self.format_processor.make_validation_oracle(self.trace_manager)
+
+    def format_all(self, model):
+        # Every level from this setup: the collection is linked once and streamed to the three training
+        # formatters, and each validation signature's traces are read once for the three oracles
+        processors = [self.line_level_processor(), self.method_level_processor(), self.bulk_line_level_processor()]
+        signatures = list(dict.fromkeys(signature for processor in processors for signature in processor.signatures_to_link()))
+        collection = self.execution_path_processor.iter_links(signatures)
+        fan_out(collection, [processor.format_for_training for processor in processors])
+        for processor in processors:
+            processor.format_for_validation(self.application_log_manager, model)
+        oracles = [{} for _ in processors]
+        selected = [set(processor.validation_signatures) for processor in processors]
+        validation_signatures = list(dict.fromkeys(signature for processor in processors for signature in processor.validation_signatures))
+        for signature in validation_signatures:
+            threads = self.trace_manager.get_traces_by_signature(signature)
+            for processor, oracle, signatures in zip(processors, oracles, selected):
+                if signature in signatures:
+                    oracle[signature] = processor.oracle_entry(threads)
+        for processor, oracle in zip(processors, oracles):
+            processor.write_validation_oracle(oracle)
@@ -1,11 +1,11 @@
 from processor.logcoco_processor import LogcocoProcessor
-from database import Database
+from database import open_database
 
 class LogcocoController:
-    def __init__(self, project: str, registry: str):
+    def __init__(self, project: str, registry: str, snapshot: str = None):
         self.project = project
         self.registry = registry
-        database = Database()
+        database = open_database(snapshot)
         self.logcoco_processor = LogcocoProcessor(self.project, self.registry, database)
 
     def prepare_log_data(self, level):
@@ -0,0 +1,13 @@
+from database import Database
+from snapshot import export_snapshot
+
+class SnapshotController:
+    def __init__(self, project: str, registry: str):
+        self.project = project
+        self.registry = registry
+        self.database = Database()
+
+    def export(self, output=None):
+        snapshot_dir = output if output else f"output/{self.project}_{self.registry}/snapshot"
+        export_snapshot(self.database, self.registry, snapshot_dir)
+        print(f"Exported snapshot of registry {self.registry} to {snapshot_dir}")
@@ -1,6 +1,15 @@
 import psycopg2
 from psycopg2.extras import RealDictCursor
+from psycopg2.pool import ThreadedConnectionPool
 import json
+import itertools
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Iterator
+from entity.trace_columns import TraceColumns
+from utils.query_metrics import instrumented
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -11,53 +20,163 @@ DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 DB_HOST =  os.getenv("DB_HOST")
 DB_PORT = os.getenv("DB_PORT")
+# Rows fetched per round trip by the server-side (named) cursors of the stream_* methods
+DB_FETCH_SIZE = int(os.getenv("DB_FETCH_SIZE", "10000"))
+# Default maximum number of connections kept by the pool, i.e. the number of queries that can run in parallel
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+
+LOGS_QUERY = "SELECT log.log_statement.statement, log.log_statement.invoked_order, log.logs_in_test.signature FROM log.log_statement JOIN log.logs_in_test ON log.log_statement.test_method_id = log.logs_in_test.test_method_id WHERE log.logs_in_test.registry_id = %s"
+LOGS_OF_CLASSES_QUERY = "SELECT log.log_statement.statement, log.log_statement.invoked_order, log.logs_in_test.signature FROM log.log_statement JOIN log.logs_in_test ON log.log_statement.test_method_id = log.logs_in_test.test_method_id WHERE log.logs_in_test.registry_id = %s AND replace(substring(log.log_statement.statement FROM %s), '$', '.') = ANY(%s)"
+# Trace rows without test-code paths, numbered per signature in (test trace, invoked order) and returned
+# grouped by thread: threads in order of their first trace, each thread's traces in order.
+TRACES_QUERY = (
+    "SELECT signature, test_trace_id, thread_id, invoked_order, path, position FROM ("
+    "SELECT trace.trace_in_test.signature, trace.trace_in_source.test_trace_id, trace.trace_in_source.thread_id, trace.trace_in_source.invoked_order, trace.trace_in_source.path, "
+    "ROW_NUMBER() OVER (PARTITION BY trace.trace_in_test.signature ORDER BY trace.trace_in_source.test_trace_id, trace.trace_in_source.invoked_order) AS position "
+    "FROM trace.trace_in_source JOIN trace.trace_in_test ON trace.trace_in_source.test_trace_id = trace.trace_in_test.test_trace_id "
+    "WHERE {condition} AND trace.trace_in_source.path NOT LIKE '%%/test/%%'"
+    ") AS traces ORDER BY signature, MIN(position) OVER (PARTITION BY signature, thread_id), position"
+)
+EXECUTION_PATH_QUERY = TRACES_QUERY.format(condition="trace.trace_in_test.signature = %s AND trace.trace_in_test.registry_id = %s")
+EXECUTION_PATHS_QUERY = TRACES_QUERY.format(condition="trace.trace_in_test.registry_id = %s")
+EXECUTION_PATHS_COPY_QUERY = f"COPY ({EXECUTION_PATHS_QUERY}) TO STDOUT WITH (FORMAT csv)"
 
 class Database:
 
-    def __init__(self):
-        self.conn = psycopg2.connect(
+    def __init__(self, pool_size=DB_POOL_SIZE):
+        self.pool = ThreadedConnectionPool(
+            1,
+            pool_size,
             dbname=DB_NAME,
             user=DB_USER,
             password=DB_PASSWORD,
             host=DB_HOST,
             port=DB_PORT
         )
-    
-    def open_cur(self):
-        self.cur = self.conn.cursor(cursor_factory=RealDictCursor)
-    
+        # ThreadedConnectionPool raises instead of waiting when it is exhausted, so callers queue here
+        self.available_connections = threading.BoundedSemaphore(pool_size)
+        self.cursor_ids = itertools.count()
+
+    @contextmanager
+    def connection(self):
+        self.available_connections.acquire()
+        try:
+            conn = self.pool.getconn()
+            broken = False
+            try:
+                yield conn
+            finally:
+                try:
+                    # Every query is read-only; end the transaction before the connection is reused
+                    conn.rollback()
+                except psycopg2.Error:
+                    # A dead connection is closed rather than pooled; an error of the query itself still propagates
+                    broken = True
+                finally:
+                    self.pool.putconn(conn, close=broken)
+        finally:
+            self.available_connections.release()
+
+    @contextmanager
+    def cursor(self, name=None):
+        with self.connection() as conn:
+            cur = conn.cursor(name=name, cursor_factory=RealDictCursor)
+            try:
+                yield cur
+            finally:
+                cur.close()
+
+    @instrumented
     def get_commit_hash(self, registry) -> str | None:
-        self.open_cur()
-        self.cur.execute("SELECT commit_id FROM run.registry WHERE registry_id = %s", (registry,))
-        row = self.cur.fetchone()
-        self.close_cur()
+        with self.cursor() as cur:
+            cur.execute("SELECT commit_id FROM run.registry WHERE registry_id = %s", (registry,))
+            row = cur.fetchone()
         return row['commit_id'] if row else None
 
+    @instrumented
     def get_logs(self, registry) -> list[dict[str, str]]:
-        self.open_cur()
-        query = "SELECT log.log_statement.statement, log.log_statement.invoked_order, log.logs_in_test.signature FROM log.log_statement JOIN log.logs_in_test ON log.log_statement.test_method_id = log.logs_in_test.test_method_id WHERE log.logs_in_test.registry_id = %s"
-        self.cur.execute(query, (registry,))
-        rows = self.cur.fetchall()
-        self.close_cur()
-        return rows
-    
+        with self.cursor() as cur:
+            cur.execute(LOGS_QUERY, (registry,))
+            return cur.fetchall()
+
+    @instrumented
     def get_signatures(self, registry_id: str) -> list[str]:
-        self.open_cur()
-        self.cur.execute("SELECT signature, MIN(test_trace_id) FROM trace.trace_in_test WHERE registry_id = %s GROUP BY signature ORDER by MIN(trace.trace_in_test.test_trace_id) ASC", (registry_id,))
-        rows = self.cur.fetchall()
-        self.close_cur()
+        with self.cursor() as cur:
+            cur.execute("SELECT signature, MIN(test_trace_id) FROM trace.trace_in_test WHERE registry_id = %s GROUP BY signature ORDER by MIN(trace.trace_in_test.test_trace_id) ASC", (registry_id,))
+            rows = cur.fetchall()
         return [row['signature'] for row in rows]
 
+    @instrumented
     def get_execution_path(self, registry, signature) -> list[dict[str, str]]:
-        self.open_cur()
-        query = "SELECT trace.trace_in_source.* FROM trace.trace_in_source LEFT JOIN trace.trace_in_test ON trace.trace_in_source.test_trace_id = trace.trace_in_test.test_trace_id WHERE signature = %s AND trace.trace_in_test.registry_id = %s ORDER BY trace.trace_in_source.test_trace_id, trace.trace_in_source.invoked_order"
-        self.cur.execute(query, (signature, registry))
-        rows = self.cur.fetchall()
-        self.close_cur()
-        return rows
-
-    def close_cur(self):
-        self.cur.close()
-    
+        with self.cursor() as cur:
+            cur.execute(EXECUTION_PATH_QUERY, (signature, registry))
+            return cur.fetchall()
+
+    @instrumented
+    def get_execution_paths(self, registry) -> list[dict[str, str]]:
+        with self.cursor() as cur:
+            cur.execute(EXECUTION_PATHS_QUERY, (registry,))
+            return cur.fetchall()
+
+    @instrumented
+    def copy_execution_paths(self, registry) -> TraceColumns:
+        # COPY streams CSV straight into typed columns, skipping the per-row dicts of RealDictCursor
+        columns = TraceColumns()
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                # COPY does not take bind parameters, so the registry is quoted client-side
+                cur.copy_expert(cur.mogrify(EXECUTION_PATHS_COPY_QUERY, (registry,)).decode(), columns)
+        columns.flush()
+        return columns
+
+    @instrumented
+    def stream_logs(self, registry, batch_size=DB_FETCH_SIZE, class_pattern=None, classes=None) -> Iterator[dict[str, str]]:
+        # With classes, only statements whose class (first group of class_pattern, '$' as '.') is listed are sent
+        if classes is not None:
+            return self.stream(LOGS_OF_CLASSES_QUERY, (registry, class_pattern, list(classes)), batch_size)
+        return self.stream(LOGS_QUERY, (registry,), batch_size)
+
+    @instrumented
+    def stream_execution_path(self, registry, signature, batch_size=DB_FETCH_SIZE) -> Iterator[dict[str, str]]:
+        return self.stream(EXECUTION_PATH_QUERY, (signature, registry), batch_size)
+
+    @instrumented
+    def stream_execution_paths(self, registry, batch_size=DB_FETCH_SIZE) -> Iterator[dict[str, str]]:
+        return self.stream(EXECUTION_PATHS_QUERY, (registry,), batch_size)
+
+    def stream(self, query, params, batch_size=DB_FETCH_SIZE) -> Iterator[dict[str, str]]:
+        # A named cursor keeps the result set on the server and fetches batch_size rows per round trip.
+        # The pooled connection stays checked out until the generator is exhausted or closed.
+        with self.cursor(name=f"cov_pred_stream_{next(self.cursor_ids)}") as cur:
+            cur.itersize = batch_size
+            cur.execute(query, params)
+            for row in cur:
+                yield row
+
+    def fetch_execution_paths(self, registry, signatures: list[str], workers=DB_POOL_SIZE) -> Iterator[tuple[str, list[dict[str, str]]]]:
+        return self.fetch_concurrently(self.get_execution_path, registry, signatures, workers)
+
+    def fetch_concurrently(self, fetch, registry, signatures: list[str], workers=DB_POOL_SIZE) -> Iterator[tuple[str, list[dict[str, str]]]]:
+        # Yields (signature, rows) in the order of signatures while up to `workers` queries run on pooled connections.
+        # Only `workers` queries are submitted ahead of the caller, so results it has not read yet never pile up.
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            for signature in signatures:
+                pending.append((signature, executor.submit(fetch, registry, signature)))
+                if len(pending) >= workers:
+                    signature, future = pending.popleft()
+                    yield signature, future.result()
+            while pending:
+                signature, future = pending.popleft()
+                yield signature, future.result()
+
     def close_conn(self):
-        self.conn.close()
+        self.pool.closeall()
+
+
+def open_database(snapshot_dir=None, pool_size=DB_POOL_SIZE):
+    # snapshot imports this module, so it is imported here rather than at the top
+    if snapshot_dir:
+        from snapshot import Snapshot
+        return Snapshot(snapshot_dir)
+    return Database(pool_size)
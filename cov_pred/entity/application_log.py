@@ -1,136 +1,66 @@
-import re
-from utils.java_util import extract_java_classes
+from utils.log_parser import LogParser, ParsedLog
+
+UNPARSED = object()
 
 class ApplicationLog:
 
-    def __init__(self, log_statement: str, project: str, order: int, class_to_path: dict[str, str]):
-        self.patterns = {
-            "zookeeper" : {
-                "line": r'[A-Za-z0-9_$]+@\d+',
-                "class": r'[A-Za-z0-9_$]+@\d+'
-            },
-            "druid": {
-                "line": r'[A-Za-z0-9_$]+@\d+',
-                "class": r'[A-Za-z0-9_$]+@\d+'
-            },
-            "activemq": {
-                "line": r'\s*[A-Za-z0-9_$]+\s*@\d+',
-                "class": r'\s*[A-Za-z0-9_$]+\s*@\d+'
-            }
-        }
+    # Thread id, level, class and line come from one parse of the statement, done on first access
+    # unless the caller passes them already parsed; the file follows from the class
+    __slots__ = ("log_statement", "project", "class_to_path", "order", "parsed", "_file")
+
+    def __init__(self, log_statement: str, project: str, order: int, class_to_path: dict[str, str], parsed: ParsedLog = None):
         self.log_statement = log_statement
         self.project = project
         self.class_to_path = class_to_path
-        self.thread_id = None
-        self.thread_id = self.get_thread_id()
-        self.line = None
-        self.line = self.get_line()
-        self.class_name = None
-        self.class_name = self.get_class()
         self.order = order
-        self.file = self.set_file()
+        self.parsed = parsed
+        self._file = UNPARSED
+
+    @property
+    def thread_id(self) -> str | None:
+        return self.get_thread_id()
+
+    @property
+    def line(self) -> str | None:
+        return self.get_line()
+
+    @property
+    def class_name(self) -> str | None:
+        return self.get_class()
 
+    @property
+    def file(self) -> str | None:
+        return self.get_file()
 
     def get_log_statement(self) -> str:
         return self.log_statement
 
+    def get_parsed(self) -> ParsedLog:
+        if self.parsed is None:
+            self.parsed = LogParser.for_project(self.project).parse(self.log_statement)
+            if self.parsed.class_name is None:
+                print("No class found in log statement:", self.log_statement)
+        return self.parsed
 
     def get_thread_id(self) -> str | None:
-        if self.thread_id is not None:
-            return self.thread_id
-        log_levels = ['INFO', 'DEBUG', 'WARN', 'ERROR']
-        if self.project == "zookeeper":
-            for level in log_levels:
-                level_index = self.log_statement.find(level)
-                if level_index == -1:
-                    continue
-                after_level = self.log_statement[level_index + len(level):]
-                bracket_start = after_level.find('[')
-                if bracket_start == -1:
-                    return None
-                # just in case bracket in bracket
-                bracket_content_end = after_level.find('@', bracket_start)
+        return self.get_parsed().thread_id
 
-                if bracket_content_end == -1:
-                    return None
-                bracket_content = after_level[bracket_start + 1:bracket_content_end]
-                thread_id = "".join(bracket_content.split(':')[:-1])
-                return thread_id
-        else:
-            for level in log_levels:
-                level_index = self.log_statement.find(level)
-                if level_index == -1:
-                    continue
-                before_level = self.log_statement[:level_index]
-                bracket_start = before_level.find('[')
-                if bracket_start == -1:
-                    after_level = self.log_statement[level_index:]
-                    thread_id = after_level.split('|')[1].strip()
-                    if thread_id:
-                        return thread_id
-                # just in case bracket in bracket
-                bracket_content_end = before_level.rfind(']')
-
-                if bracket_content_end == -1:
-                    return None
-                bracket_content = before_level[bracket_start + 1:bracket_content_end]
-                thread_id = bracket_content.strip()
-                return thread_id
-
-        return None
+    def get_level(self) -> str | None:
+        return self.get_parsed().level
 
     def get_line(self) -> str | None:
-        if self.line is not None:
-            return self.line
-
-        pattern = self.patterns[self.project]["line"]
-        match = re.search(pattern, self.log_statement)
-        if match:
-            return match.group(0).split('@')[-1]
-        
-        # activemq sometimes have different pattern
-        pattern = r'[A-Za-z0-9_$]+@\d+'
-        match = re.search(pattern, self.log_statement)
-        if match:
-            return match.group(0).split('@')[-1]
-        return None
+        return self.get_parsed().line
 
     def get_class(self) -> str | None:
-        if self.class_name is not None:
-            return self.class_name
-
-        pattern = self.patterns[self.project]["class"]
-        match = re.search(pattern, self.log_statement)
-        if match:
-            class_name = match.group(0).split('@')[0]
-            class_name = class_name.strip()
-            if "$" in class_name:
-                return class_name.replace("$", ".")
-            return class_name
-        
-        # activemq sometimes have different pattern
-        pattern = r'[A-Za-z0-9_$]+@\d+'
-        match = re.search(pattern, self.log_statement)
-        if match:
-            class_name = match.group(0).split('@')[0]
-            class_name = class_name.strip()
-            if "$" in class_name:
-                return class_name.replace("$", ".")
-            return class_name
-        
-        print("No class found in log statement:", self.log_statement)
-        return None
-
-    def set_file(self):
-        file = self.class_to_path.get(self.class_name)
-        return file
+        return self.get_parsed().class_name
 
     def get_file(self) -> str | None:
-        return self.file
+        if self._file is UNPARSED:
+            self._file = self.class_to_path.get(self.get_class())
+        return self._file
     
     def get_order(self) -> int:
         return self.order
     
     def equals(self, other: 'ApplicationLog') -> bool:
         return self.get_file() == other.get_file() and self.get_line() == other.get_line() and self.get_order() == other.get_order()
-    
\ No newline at end of file
@@ -1,3 +1,7 @@
+from array import array
+from bisect import bisect_left
+from utils.fingerprint import location_key, fingerprint
+
 class Trace:
 
     def __init__(self, path: str, thread_num: int, order: int):
@@ -23,4 +27,235 @@ class Trace:
         return self.path == other.path and self.thread_num == other.thread_num and self.order == other.order
     
     def __str__(self):
-        return f"Trace(path={self.path}, thread_num={self.thread_num}, order={self.order})"
\ No newline at end of file
+        return f"Trace(path={self.path}, thread_num={self.thread_num}, order={self.order})"
+
+def build_position_index(location_ids) -> dict[int, array]:
+    # Location id -> ascending indices at which the sequence has that location
+    position_index = {}
+    for index, location_id in enumerate(location_ids):
+        if location_id not in position_index:
+            position_index[location_id] = array('i')
+        position_index[location_id].append(index)
+    return position_index
+
+
+def next_position(position_index: dict[int, array], location_id: int | None, start: int) -> int | None:
+    positions = position_index.get(location_id)
+    if positions is None:
+        return None
+    i = bisect_left(positions, start)
+    if i == len(positions):
+        return None
+    return positions[i]
+
+
+def align_locations(position_index: dict[int, array], location_ids: list[int | None], start: int = 0) -> list[int] | None:
+    # Positions of the locations as a subsequence from start, each taken at its next occurrence
+    # after the previous one, or None if they do not all occur in that order
+    positions = []
+    for location_id in location_ids:
+        position = next_position(position_index, location_id, start)
+        if position is None:
+            return None
+        positions.append(position)
+        start = position + 1
+    return positions
+
+
+class PathTable:
+    # Interned trace paths shared by all threads of a TraceManager: each distinct path
+    # string is stored once, with its file as an interned id, its line as an int and
+    # its source location (file, line) as an id shared by the paths at that location.
+
+    def __init__(self):
+        self.paths = []
+        self.path_index = {}
+        self.files = []
+        self.file_index = {}
+        self.path_files = array('i')
+        self.path_lines = array('i')
+        self.path_locations = array('i')
+        self.location_keys = []
+        self.location_ids = {}
+
+    def intern(self, path: str) -> int:
+        path_id = self.path_index.get(path)
+        if path_id is not None:
+            return path_id
+        path_id = len(self.paths)
+        self.path_index[path] = path_id
+        self.paths.append(path)
+        file = path.split(";")[0]
+        file_id = self.file_index.get(file)
+        if file_id is None:
+            file_id = len(self.files)
+            self.file_index[file] = file_id
+            self.files.append(file)
+        line = int(path.split('@')[-1])
+        self.path_files.append(file_id)
+        self.path_lines.append(line)
+        self.location_keys.append(location_key(file, line))
+        location_id = self.location_ids.get((file_id, line))
+        if location_id is None:
+            location_id = len(self.location_ids)
+            self.location_ids[(file_id, line)] = location_id
+        self.path_locations.append(location_id)
+        return path_id
+
+    def unique_file_lines(self, path_ids) -> list[tuple[str, int]]:
+        # Distinct (file, line) pairs of a sequence of path ids, in order of first appearance
+        files = self.files
+        path_files = self.path_files
+        path_lines = self.path_lines
+        return [(files[path_files[path_id]], path_lines[path_id]) for path_id in dict.fromkeys(path_ids)]
+
+    def get_location_id(self, file: str | None, line: str | int | None) -> int | None:
+        file_id = self.file_index.get(file)
+        if file_id is None or line is None:
+            return None
+        return self.location_ids.get((file_id, int(line)))
+
+
+class ThreadPath:
+    # Execution path of one thread as contiguous arrays of path ids and orders. Indexing and
+    # iteration hand out Trace views; the array methods work without creating them.
+    # With counts, consecutive executions of the same path are stored once as a run: positions,
+    # segments and alignment then refer to runs, whose order is that of their first execution.
+    __slots__ = ("table", "thread_id", "path_ids", "orders", "counts", "location_fingerprint")
+
+    def __init__(self, table: PathTable, thread_id: int, path_ids: array = None, orders: array = None, counts: array = None):
+        self.table = table
+        self.thread_id = thread_id
+        self.path_ids = path_ids if path_ids is not None else array('i')
+        self.orders = orders if orders is not None else array('q')
+        self.counts = counts
+        self.location_fingerprint = None
+
+    @classmethod
+    def compressed(cls, table: PathTable, thread_id: int) -> 'ThreadPath':
+        return cls(table, thread_id, counts=array('i'))
+
+    @property
+    def thread_num(self) -> str:
+        return "thread_" + str(self.thread_id)
+
+    def append(self, path: str, order: int):
+        self.append_path_id(self.table.intern(path), order)
+
+    def append_path_id(self, path_id: int, order: int):
+        if self.counts is not None:
+            if self.path_ids and self.path_ids[-1] == path_id:
+                self.counts[-1] += 1
+                return
+            self.counts.append(1)
+        self.path_ids.append(path_id)
+        self.orders.append(order)
+        self.location_fingerprint = None
+
+    def trace_count(self) -> int:
+        # Executed traces, counting every repeat of a run
+        if self.counts is None:
+            return len(self.path_ids)
+        return sum(self.counts)
+
+    def __len__(self) -> int:
+        return len(self.path_ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            counts = self.counts[index] if self.counts is not None else None
+            return ThreadPath(self.table, self.thread_id, self.path_ids[index], self.orders[index], counts)
+        return Trace(self.table.paths[self.path_ids[index]], self.thread_id, self.orders[index])
+
+    def __iter__(self):
+        for index in range(len(self.path_ids)):
+            yield self[index]
+
+    def get_file(self, index: int) -> str:
+        return self.table.files[self.table.path_files[self.path_ids[index]]]
+
+    def get_line(self, index: int) -> str:
+        return str(self.table.path_lines[self.path_ids[index]])
+
+    def position_index(self) -> dict[int, array]:
+        # Built on each call and never kept on the thread: callers hold it only while aligning against this thread,
+        # and pass it to find, contains_locations and align to reuse it across calls
+        path_locations = self.table.path_locations
+        return build_position_index(path_locations[path_id] for path_id in self.path_ids)
+
+    def find(self, file: str | None, line: str | None, start: int = 0, position_index: dict[int, array] = None) -> int | None:
+        # First index at or after start whose trace is at file:line
+        location_id = self.table.get_location_id(file, line)
+        if location_id is None:
+            return None
+        return next_position(position_index if position_index is not None else self.position_index(), location_id, start)
+
+    def contains_locations(self, location_ids: set[int | None], position_index: dict[int, array] = None) -> bool:
+        # Whether every location is executed at least once; None (a location never traced) is never contained
+        return (position_index if position_index is not None else self.position_index()).keys() >= location_ids
+
+    def align(self, location_ids: list[int | None], start: int = 0, position_index: dict[int, array] = None) -> list[int] | None:
+        return align_locations(position_index if position_index is not None else self.position_index(), location_ids, start)
+
+    def unique_file_lines(self) -> list[tuple[str, int]]:
+        # Distinct (file, line) pairs in order of first execution
+        return self.table.unique_file_lines(self.path_ids)
+
+    def segment(self, start: int, end: int) -> 'PathSegment':
+        return PathSegment(self, start, end)
+
+    def fingerprint(self) -> int:
+        # Fingerprint of the executed (file, line) sequence, comparable across threads, signatures and managers
+        if self.location_fingerprint is None:
+            location_keys = self.table.location_keys
+            self.location_fingerprint = fingerprint(location_keys[path_id] for path_id in self.path_ids)
+        return self.location_fingerprint
+
+    def same_locations(self, other: 'ThreadPath') -> bool:
+        # Whether both threads of this table execute the same (file, line) sequence, the repeats of each run included
+        path_locations = self.table.path_locations
+        return self.counts == other.counts and len(self) == len(other) and all(
+            path_locations[path_id] == path_locations[other_path_id] for path_id, other_path_id in zip(self.path_ids, other.path_ids)
+        )
+
+    def equals(self, other: 'ThreadPath') -> bool:
+        if self.thread_id != other.thread_id or self.orders != other.orders or self.counts != other.counts or len(self) != len(other):
+            return False
+        if self.table is other.table:
+            return self.path_ids == other.path_ids
+        # Path ids are only meaningful within their table; each manager interns paths in its own order
+        paths, other_paths = self.table.paths, other.table.paths
+        return all(paths[path_id] == other_paths[other_path_id] for path_id, other_path_id in zip(self.path_ids, other.path_ids))
+
+
+class PathSegment:
+    # Traces start (included) to end (excluded) of a ThreadPath, read in place instead of copied.
+    # Segments between consecutive logs overlap, so copies would repeat most of the thread.
+    __slots__ = ("thread", "start", "end")
+
+    def __init__(self, thread: ThreadPath, start: int, end: int):
+        self.thread = thread
+        self.start = start
+        self.end = min(end, len(thread))
+
+    @property
+    def thread_num(self) -> str:
+        return self.thread.thread_num
+
+    def __len__(self) -> int:
+        return max(self.end - self.start, 0)
+
+    def __getitem__(self, index: int) -> Trace:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("segment index out of range")
+        return self.thread[self.start + index]
+
+    def __iter__(self):
+        for index in range(self.start, self.end):
+            yield self.thread[index]
+
+    def unique_file_lines(self) -> list[tuple[str, int]]:
+        with memoryview(self.thread.path_ids) as path_ids:
+            return self.thread.table.unique_file_lines(path_ids[self.start:self.end])
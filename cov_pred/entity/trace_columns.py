@@ -0,0 +1,73 @@
+import csv
+from array import array
+from typing import Iterator
+
+
+class TraceColumns:
+    # Trace rows stored column-wise in query order: signatures and paths are interned into
+    # string tables and the numeric columns are typed arrays, so no per-row dict is created.
+
+    def __init__(self):
+        self.signatures = []
+        self.signature_index = {}
+        self.paths = []
+        self.path_index = {}
+        self.signature_ids = array('i')
+        self.path_ids = array('i')
+        self.test_trace_ids = array('q')
+        self.thread_ids = array('q')
+        self.invoked_orders = array('q')
+        self.positions = array('q')
+        self.pending = b""
+        self.bytes_read = 0
+
+    def __len__(self) -> int:
+        return len(self.path_ids)
+
+    def intern(self, value: str, table: list[str], index: dict[str, int]) -> int:
+        value_id = index.get(value)
+        if value_id is None:
+            value_id = len(table)
+            index[value] = value_id
+            table.append(value)
+        return value_id
+
+    def add_row(self, signature: str, test_trace_id: int, thread_id: int, invoked_order: int, path: str, position: int):
+        self.signature_ids.append(self.intern(signature, self.signatures, self.signature_index))
+        self.test_trace_ids.append(int(test_trace_id))
+        self.thread_ids.append(int(thread_id))
+        self.invoked_orders.append(int(invoked_order))
+        self.path_ids.append(self.intern(path, self.paths, self.path_index))
+        self.positions.append(int(position))
+
+    def write(self, data):
+        # File-like target for cursor.copy_expert: parses complete CSV lines as COPY sends them
+        if isinstance(data, str):
+            data = data.encode()
+        self.bytes_read += len(data)
+        lines = (self.pending + data).split(b"\n")
+        self.pending = lines.pop()
+        for row in csv.reader(line.decode() for line in lines):
+            self.add_row(*row)
+
+    def flush(self):
+        if self.pending:
+            for row in csv.reader([self.pending.decode()]):
+                self.add_row(*row)
+            self.pending = b""
+
+    def iter_signatures(self) -> Iterator[tuple[str, range]]:
+        """Yield (signature, row range) for each contiguous run of rows of one signature."""
+        for signature_id, rows in self.iter_runs(self.signature_ids, range(len(self))):
+            yield self.signatures[signature_id], rows
+
+    def iter_threads(self, rows: range) -> Iterator[tuple[int, range]]:
+        """Yield (thread id, row range) for each contiguous run of rows of one thread within rows."""
+        return self.iter_runs(self.thread_ids, rows)
+
+    def iter_runs(self, values: array, rows: range) -> Iterator[tuple[int, range]]:
+        start = rows.start
+        for i in range(rows.start + 1, rows.stop + 1):
+            if i == rows.stop or values[i] != values[start]:
+                yield values[start], range(start, i)
+                start = i
@@ -1,22 +1,32 @@
 import argparse
+from utils.query_metrics import query_metrics
 from cli.format_cli import setup_format_parser
 from cli.gpt_cli import setup_gpt_parser
 from cli.evaluate_cli import setup_evaluate_parser
 from cli.comparison_cli import setup_compare_parser
+from cli.snapshot_cli import setup_snapshot_parser
 
 def main():
     parser = argparse.ArgumentParser(description='Coverage prediction tool')
+    parser.add_argument('--slow-query-ms', type=float, help='Log database calls slower than this many milliseconds')
     subparsers = parser.add_subparsers(dest='command', help='Available commands')
     
     setup_format_parser(subparsers)
     setup_gpt_parser(subparsers)
     setup_evaluate_parser(subparsers)
     setup_compare_parser(subparsers)
+    setup_snapshot_parser(subparsers)
 
     args = parser.parse_args()
     
     if hasattr(args, 'func'):
+        if args.slow_query_ms is not None:
+            query_metrics.slow_query_ms = args.slow_query_ms
         args.func(args)
+        # Database time of the whole command, next to the outputs it produced
+        if query_metrics.methods:
+            command = "_".join(filter(None, [args.command, getattr(args, 'mode', None)]))
+            query_metrics.dump(f"output/{args.project}_{args.registry}/{command}_db_metrics.json")
     else:
         parser.print_help()
 
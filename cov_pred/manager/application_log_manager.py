@@ -1,5 +1,7 @@
 from entity.application_log import ApplicationLog
 from database import Database
+from utils.log_parser import LogParser
+from utils.fingerprint import location_key, fingerprint, unique_threads
 
 class ApplicationLogManager:
 
@@ -8,6 +10,7 @@ class ApplicationLogManager:
         self.registry = registry
         self.project = project
         self.class_to_path = class_to_path
+        self.parser = LogParser.for_project(project)
         self.application_logs = None
         self.application_logs = self.get_logs()
         self.signatures_including_logs = None
@@ -18,14 +21,14 @@ class ApplicationLogManager:
         if self.application_logs:
             return self.application_logs
 
-        application_logs = self.db.get_logs(self.registry)
+        # Logs whose class is unknown or lives in test code are dropped by the query
+        source_classes = [class_name for class_name, file in self.class_to_path.items() if "/test/" not in file]
+        application_logs = self.db.stream_logs(self.registry, class_pattern=self.parser.class_pattern(), classes=source_classes)
         application_logs_with_signature = {}
+        # Each statement is parsed by a single match as it is streamed in
+        parse = self.parser.parse
         for log in application_logs:
-            application_log = ApplicationLog(log['statement'], self.project, log['invoked_order'], self.class_to_path)
-            if application_log.get_file() is None:
-                continue
-            if "/test/" in application_log.get_file():
-                continue
+            application_log = ApplicationLog(log['statement'], self.project, log['invoked_order'], self.class_to_path, parse(log['statement']))
             if log['signature'] not in application_logs_with_signature:
                 application_logs_with_signature[log['signature']] = []
             application_logs_with_signature[log['signature']].append(application_log)
@@ -42,15 +45,18 @@ class ApplicationLogManager:
                 application_logs[log.get_thread_id()] = []
             application_logs[log.get_thread_id()].append(log)
 
-        application_logs_for_check = application_logs.copy()
-        for thread_id, logs in application_logs_for_check.items():
-            for thread_id2, logs2 in application_logs_for_check.items():
-                if thread_id != thread_id2:
-                    if self.check_equal(logs, logs2) and thread_id2 in application_logs:
-                        application_logs.pop(thread_id2)
-        for thread_id, logs in application_logs.items():
-            application_logs[thread_id] = sorted(self.remove_duplicated_logs(logs), key=lambda x: x.order)
-        return application_logs
+        # Threads are ordered before they are compared: logs arrive in no particular order, and get_fingerprint
+        # hashes the ordered logs too
+        ordered_application_logs = {thread_id: self.remove_duplicated_logs(sorted(logs, key=lambda x: x.order)) for thread_id, logs in application_logs.items()}
+        # Remove duplicated threads: a thread logging the same (file, line) sequence as an earlier one is dropped,
+        # the same key as for trace threads
+        return unique_threads(ordered_application_logs, self.fingerprint_logs, self.same_locations)
+
+    def fingerprint_logs(self, logs: list[ApplicationLog]) -> int:
+        return fingerprint(location_key(log.get_file(), log.get_line()) for log in logs)
+
+    def same_locations(self, logs1: list[ApplicationLog], logs2: list[ApplicationLog]) -> bool:
+        return [(log.get_file(), log.get_line()) for log in logs1] == [(log.get_file(), log.get_line()) for log in logs2]
     
     def remove_duplicated_logs(self, logs: dict[str, ApplicationLog]) -> list[ApplicationLog]:
         seen_combinations = set()
@@ -77,6 +83,13 @@ class ApplicationLogManager:
             return logs_by_signature[thread_id]
         return []
     
+    def get_fingerprint(self, signature: str, thread_id: str) -> int | None:
+        # Fingerprint of the thread's (file, line) sequence, equal for threads logging the same statements in the same order
+        logs = self.get_logs_by_thread(signature, thread_id)
+        if logs:
+            return self.fingerprint_logs(logs)
+        return None
+
     def check_equal(self, logs1: list[ApplicationLog], logs2: list[ApplicationLog]) -> bool:
         if len(logs1) != len(logs2):
             return False
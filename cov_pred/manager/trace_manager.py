@@ -1,69 +1,154 @@
-from entity.trace import Trace
+from entity.trace import Trace, PathTable, ThreadPath
+from entity.trace_columns import TraceColumns
 from database import Database
+from typing import Iterable
+from collections import OrderedDict
+import itertools
+from utils.fingerprint import unique_threads
 
 class TraceManager:
 
-    def __init__(self, database: Database, registry: str, project: str):
+    LOAD_MODES = ["signature", "bulk", "concurrent", "copy", "lazy"]
+
+    def __init__(self, database: Database, registry: str, project: str, load_mode: str = "signature", workers: int = 4, cache_size: int = 5000000, compress_runs: bool = False):
+        if load_mode not in self.LOAD_MODES:
+            raise ValueError(f"{load_mode} load mode is not supported")
         self.db = database
         self.registry = registry
         self.project = project
+        self.load_mode = load_mode
+        self.workers = workers
+        # Store consecutive repeats of a path (loops, polling threads) once with a count
+        self.compress_runs = compress_runs
+        # Traces (not signatures) kept by the "lazy" mode before the least recently used signatures are dropped
+        self.cache_size = cache_size
+        self.cached_sizes = {}
+        self.cached_traces = 0
         self.signatures = self.db.get_signatures(self.registry)
+        self.path_table = PathTable()
         self.execution_paths = None
         self.execution_paths = self.get_execution_paths()
 
-    def get_execution_paths(self) -> dict[str, dict[str, list[Trace]]]:
+    def get_execution_paths(self) -> dict[str, dict[str, ThreadPath]]:
         if self.execution_paths:
             return self.execution_paths
 
+        # "lazy" loads nothing up front: signatures are fetched on first access into an LRU cache
+        if self.load_mode == "lazy":
+            return OrderedDict()
+
+        # "bulk" pulls the whole registry in one ordered query instead of one query per signature.
+        # Rows are streamed and parsed as they arrive, so only one batch of raw rows is held at a time.
+        if self.load_mode == "bulk":
+            loaded = {}
+            for signature, paths in itertools.groupby(self.db.stream_execution_paths(self.registry), key=lambda path: path['signature']):
+                loaded[signature] = self.build_execution_path(paths)
+            return {signature: loaded.get(signature, {}) for signature in self.signatures}
+
+        # "copy" pulls the whole registry through COPY into typed columns instead of row dicts
+        if self.load_mode == "copy":
+            columns = self.db.copy_execution_paths(self.registry)
+            loaded = {}
+            for signature, rows in columns.iter_signatures():
+                loaded[signature] = self.build_execution_path_from_columns(columns, rows)
+            return {signature: loaded.get(signature, {}) for signature in self.signatures}
+
+        # "concurrent" runs one query per signature on up to `workers` pooled connections
+        if self.load_mode == "concurrent":
+            execution_paths = {}
+            for signature, paths in self.db.fetch_execution_paths(self.registry, self.signatures, self.workers):
+                execution_paths[signature] = self.build_execution_path(paths)
+            return execution_paths
+
         execution_paths = {}
         for signature in self.signatures:
-            paths = self.db.get_execution_path(self.registry, signature)
-            order = 1
-            traces = []
-            for path in paths:
-                if "/test/" in path["path"]:
-                    continue
-
-                trace = Trace(path['path'], path['thread_id'], order)
-                traces.append(trace)
-                order += 1
-            execution_path = self.classify_traces_by_thread(traces)
-            execution_paths[signature] = execution_path
+            paths = self.db.stream_execution_path(self.registry, signature)
+            execution_paths[signature] = self.build_execution_path(paths)
         return execution_paths
 
+    def build_execution_path(self, paths: Iterable[dict[str, str]]) -> dict[str, ThreadPath]:
+        # Rows come without test paths, grouped by thread and ordered, with their position in the test as order
+        execution_path = {}
+        for thread_id, thread_paths in itertools.groupby(paths, key=lambda path: path['thread_id']):
+            traces = self.new_thread_path(thread_id)
+            for path in thread_paths:
+                traces.append(path['path'], path['position'])
+            execution_path[traces.thread_num] = traces
+        return self.classify_traces_by_thread(execution_path)
+
+    def build_execution_path_from_columns(self, columns: TraceColumns, rows: range) -> dict[str, ThreadPath]:
+        # Column path ids are translated to path table ids once per distinct path
+        path_ids = {}
+        execution_path = {}
+        for thread_id, thread_rows in columns.iter_threads(rows):
+            traces = self.new_thread_path(thread_id)
+            for i in thread_rows:
+                column_path_id = columns.path_ids[i]
+                if column_path_id not in path_ids:
+                    path_ids[column_path_id] = self.path_table.intern(columns.paths[column_path_id])
+                traces.append_path_id(path_ids[column_path_id], columns.positions[i])
+            execution_path[traces.thread_num] = traces
+        return self.classify_traces_by_thread(execution_path)
+
+    def new_thread_path(self, thread_id: int) -> ThreadPath:
+        if self.compress_runs:
+            return ThreadPath.compressed(self.path_table, thread_id)
+        return ThreadPath(self.path_table, thread_id)
+
     def get_signatures(self):
         return self.signatures
     
-    def classify_traces_by_thread(self, traces: list[Trace]) -> dict[str, list[Trace]]:
-        execution_path = {}
-        for trace in traces:
-            if trace.thread_num not in execution_path:
-                execution_path[trace.thread_num] = []
-            execution_path[trace.thread_num].append(trace)
-        
-        for thread_num, traces in execution_path.items():
-            execution_path[thread_num] = sorted(traces, key=lambda x: x.order)
-
-        # Remove duplicated threads
-        execution_path_for_check = execution_path.copy()
-        for thread_num, traces in execution_path_for_check.items():
-            for thread_num2, traces2 in execution_path_for_check.items():
-                if thread_num != thread_num2:
-                    if self.check_equal(traces, traces2) and thread_num2 in execution_path:
-                        execution_path.pop(thread_num2)
-        return execution_path
+    def classify_traces_by_thread(self, execution_path: dict[str, ThreadPath]) -> dict[str, ThreadPath]:
+        # Remove duplicated threads: a thread executing the same (file, line) sequence as an earlier one is dropped
+        return unique_threads(execution_path, ThreadPath.fingerprint, ThreadPath.same_locations)
     
-    def get_traces_by_signature(self, signature: str) -> dict[str, list[Trace]]:
+    def get_traces_by_signature(self, signature: str) -> dict[str, ThreadPath]:
+        if self.load_mode == "lazy":
+            return self.get_cached_traces(signature)
         if signature in self.execution_paths:
             return self.execution_paths[signature]
         return {}
 
-    def get_traces_by_thread(self, signature: str, thread_num: str) -> list[Trace]:
+    def get_cached_traces(self, signature: str) -> dict[str, ThreadPath]:
+        if signature in self.execution_paths:
+            self.execution_paths.move_to_end(signature)
+            return self.execution_paths[signature]
+        if signature not in self.signatures:
+            return {}
+        execution_path = self.build_execution_path(self.db.stream_execution_path(self.registry, signature))
+        self.execution_paths[signature] = execution_path
+        # Executed traces, not runs, so that compressed paths count the same as uncompressed ones
+        self.cached_sizes[signature] = sum(traces.trace_count() for traces in execution_path.values())
+        self.cached_traces += self.cached_sizes[signature]
+        # The signature just loaded stays even if it alone exceeds the cache size
+        while self.cached_traces > self.cache_size and len(self.execution_paths) > 1:
+            evicted, _ = self.execution_paths.popitem(last=False)
+            self.cached_traces -= self.cached_sizes.pop(evicted)
+        return execution_path
+
+    def get_traces_by_thread(self, signature: str, thread_num: str) -> ThreadPath:
         traces_by_signature = self.get_traces_by_signature(signature)
         if traces_by_signature and thread_num in traces_by_signature:
             return traces_by_signature[thread_num]
         return {}
     
+    def get_fingerprint(self, signature: str, thread_num: str) -> int | None:
+        traces = self.get_traces_by_thread(signature, thread_num)
+        if traces:
+            return traces.fingerprint()
+        return None
+
+    def get_threads_by_fingerprint(self) -> dict[int, list[tuple[str, str]]]:
+        # (signature, thread) pairs sharing an execution path, e.g. the same worker code run by several tests
+        threads_by_fingerprint = {}
+        for signature in self.signatures:
+            for thread_num, traces in self.get_traces_by_signature(signature).items():
+                thread_fingerprint = traces.fingerprint()
+                if thread_fingerprint not in threads_by_fingerprint:
+                    threads_by_fingerprint[thread_fingerprint] = []
+                threads_by_fingerprint[thread_fingerprint].append((signature, thread_num))
+        return threads_by_fingerprint
+
     def get_threads_by_signature(self, signature: str) -> list[str]:
         traces_by_signature = self.get_traces_by_signature(signature)
         if traces_by_signature:
@@ -82,7 +167,9 @@ class TraceManager:
                 print(f"  {trace.path}")
             print("\n")
     
-    def check_equal(self, execution_path1: list[Trace], execution_path2: list[Trace]) -> bool:
+    def check_equal(self, execution_path1: ThreadPath | list[Trace], execution_path2: ThreadPath | list[Trace]) -> bool:
+        if isinstance(execution_path1, ThreadPath) and isinstance(execution_path2, ThreadPath):
+            return execution_path1.equals(execution_path2)
         if len(execution_path1) != len(execution_path2):
             return False
         
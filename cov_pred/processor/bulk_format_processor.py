@@ -1,73 +1,147 @@
 from sklearn.model_selection import train_test_split
-from utils.gpt import GPT
-from utils.format_util import merge_traces, string_traces, extract_file_line_from_traces, cut_prefix, make_jsonl, get_train_test_split
+from utils.gpt import GPT, BATCH_MAX_BYTES, BATCH_MAX_REQUESTS
+from utils.format_util import string_traces, union_traces, extract_file_line_from_traces, make_jsonl, get_train_test_split
 import json
+import numpy as np
 import os
 from manager.application_log_manager import ApplicationLogManager
 from manager.trace_manager import TraceManager
+from utils.token_counter import TokenCounter
+
+DEFAULT_TOKEN_BUDGET = 8192
 
 
 class BulkFormatProcessor:
 
-    def __init__(self, project: str, registry: str, signatures_including_logs: list[str], gpt: GPT, empty_and_comment_lines: dict[str, list[int]], application_log_manager: ApplicationLogManager, trace_manager: TraceManager, test_percentage=0.2, log_count_threshold=1):
+    def __init__(self, project: str, registry: str, signatures_including_logs: list[str], gpt: GPT, empty_and_comment_lines: dict[str, np.ndarray], application_log_manager: ApplicationLogManager, trace_manager: TraceManager, test_percentage=0.2, log_count_threshold=1, compression=None, token_budget=DEFAULT_TOKEN_BUDGET):
         self.project = project
         self.registry = registry
         self.test_percentage = test_percentage
         self.log_count_threshold = log_count_threshold
+        self.compression = compression
+        # Maximum tokens of the log statements of one request, None to never split a signature
+        self.token_budget = token_budget
+        self.token_counter = TokenCounter() if token_budget is not None else None
         self.signatures_including_logs = signatures_including_logs
         self.gpt = gpt
         self.empty_and_comment_lines = empty_and_comment_lines
         self.application_log_manager = application_log_manager
         self.trace_manager = trace_manager
         self.training_signatures, self.validation_signatures = get_train_test_split(self.project, self.registry, self.signatures_including_logs, test_size=self.test_percentage, random_state=42)
+        self.windows_by_signature = None
+
+    def signatures_to_link(self) -> list[str]:
+        # Only signatures split into windows need their logs linked to traces
+        return list(self.get_windows_by_signature())
+
+    def get_windows_by_signature(self) -> dict[str, list[list]]:
+        # Training signatures whose logs do not fit in one request, with their windows
+        if self.windows_by_signature is None:
+            selected = set(self.training_signatures)
+            self.windows_by_signature = {}
+            for signature in self.signatures_including_logs:
+                if signature not in selected:
+                    continue
+                windows = self.split_windows(self.get_ordered_logs(self.application_log_manager, signature))
+                if len(windows) > 1:
+                    self.windows_by_signature[signature] = windows
+        return self.windows_by_signature
 
     def format_for_training(self, collection):
-        datasets = {}
-        training_dataset = {}
-        for signature in self.signatures_including_logs:
-            datasets[signature] = {}
-            logs = self.application_log_manager.get_logs_by_signature(signature)
-            total_logs = []
-            for thread_id, log_list in logs.items():
-                total_logs.extend(log_list)
-            ordered_logs = sorted(total_logs, key=lambda x: x.order)
-            ordered_log_statements = [log.get_log_statement() for log in ordered_logs]
-            logs_str = "|".join(ordered_log_statements)
-            for thread_id, traces in self.trace_manager.get_traces_by_signature(signature).items():
-                file_line = extract_file_line_from_traces(traces, self.empty_and_comment_lines)
-                datasets[signature] = merge_traces(datasets[signature], file_line)
-            datasets[signature] = string_traces(datasets[signature])
-            training_dataset[signature] = {logs_str: datasets[signature]}
-
-        
+        selected = set(self.training_signatures)
+        training_signatures = [signature for signature in self.signatures_including_logs if signature in selected]
+        windows_by_signature = self.get_windows_by_signature()
+
+        # The collection holds the windowed signatures, one at a time. The trace manager is only used once
+        # the collection is consumed, as format all links in another thread.
+        linked_windows = {}
+        for signature, threads_collection in collection:
+            if signature in windows_by_signature:
+                linked_windows[signature] = self.link_windows(windows_by_signature[signature], threads_collection)
+
         training_data = []
-        for signature, item in training_dataset.items():
-            if signature in self.training_signatures:
-                training_data.append(self.gpt.format_for_gpt_bulk_training(item))
-        make_jsonl(training_data, f"output/{self.project}_{self.registry}/bulk_training.jsonl")
+        for signature in training_signatures:
+            threads = self.trace_manager.get_traces_by_signature(signature)
+            if signature in windows_by_signature:
+                windows = windows_by_signature[signature]
+                window_traces, linked_threads = linked_windows.get(signature, ([[] for _ in windows], set()))
+                unlinked_threads = [traces for thread_num, traces in threads.items() if traces is not None and thread_num not in linked_threads]
+                items = self.window_items(windows, window_traces, unlinked_threads)
+            else:
+                logs_str = "|".join(log.get_log_statement() for log in self.get_ordered_logs(self.application_log_manager, signature))
+                items = [{logs_str: self.oracle_entry(threads)}]
+            training_data.extend(self.gpt.format_for_gpt_bulk_training(item) for item in items)
+        make_jsonl(training_data, f"output/{self.project}_{self.registry}/bulk_training.jsonl", compression=self.compression)
 
     def format_for_validation(self, application_log_manager: ApplicationLogManager, model: str):
         validation_input = []
         for signature in self.validation_signatures:
             if signature == '':
                 print("Empty signature found in validation signatures.")
-            id_for_validation = 0
-            total_logs = []
-            for thread_id, logs in application_log_manager.get_logs_by_signature(signature).items():
-                total_logs.extend(logs)
-            ordered_logs = sorted(total_logs, key=lambda x: x.order)
-            ordered_log_statements = [log.get_log_statement() for log in ordered_logs]
-            input_data = "|".join(ordered_log_statements)
-            validation_input.append(self.gpt.format_for_gpt_bulk_validation(input_data, signature, id_for_validation, model))
-        make_jsonl(validation_input, f"output/{self.project}_{self.registry}/bulk_validation.jsonl")
+            # One request per window, with the window number as id; evaluation merges them back per signature
+            for id_for_validation, window in enumerate(self.split_windows(self.get_ordered_logs(application_log_manager, signature))):
+                input_data = "|".join(log.get_log_statement() for log in window)
+                validation_input.append(self.gpt.format_for_gpt_bulk_validation(input_data, signature, id_for_validation, model))
+        make_jsonl(validation_input, f"output/{self.project}_{self.registry}/bulk_validation.jsonl", compression=self.compression, max_bytes=BATCH_MAX_BYTES, max_requests=BATCH_MAX_REQUESTS)
+
+    def get_ordered_logs(self, application_log_manager: ApplicationLogManager, signature: str) -> list:
+        total_logs = []
+        for thread_id, logs in application_log_manager.get_logs_by_signature(signature).items():
+            total_logs.extend(logs)
+        return sorted(total_logs, key=lambda x: x.order)
+
+    def split_windows(self, ordered_logs: list) -> list[list]:
+        # Consecutive logs whose statements fit in token_budget; a statement over the budget gets a window of its own
+        if self.token_budget is None or not ordered_logs:
+            return [ordered_logs]
+        token_counts = self.token_counter.count_batch([log.get_log_statement() for log in ordered_logs])
+        windows = [[]]
+        window_tokens = 0
+        for log, tokens in zip(ordered_logs, token_counts):
+            # One more token for the '|' joining the statements
+            if windows[-1] and window_tokens + tokens + 1 > self.token_budget:
+                windows.append([])
+                window_tokens = 0
+            windows[-1].append(log)
+            window_tokens += tokens + 1
+        return windows
+
+    def link_windows(self, windows: list[list], threads_collection: dict) -> tuple[list[list[dict]], set[str]]:
+        # Lines of each window, and the trace threads its logs were linked to. A window covers the traces
+        # executed up to each of its logs and, for the last log of a thread, after it.
+        window_of_log = {log: window_id for window_id, window in enumerate(windows) for log in window}
+        window_traces = [[] for _ in windows]
+        linked_threads = set()
+        for thread_id, logs_executions in threads_collection.items():
+            for (previous_log, current_log), executions in logs_executions.items():
+                linked_threads.add(executions.thread_num)
+                window_id = window_of_log.get(current_log if current_log != "" else previous_log)
+                if window_id is not None:
+                    window_traces[window_id].append(extract_file_line_from_traces(executions, self.empty_and_comment_lines))
+        return window_traces, linked_threads
+
+    def window_items(self, windows: list[list], window_traces: list[list[dict]], unlinked_threads: list) -> list[dict[str, str]]:
+        # Threads no log was linked to cannot be placed between logs, so their lines belong to every window:
+        # merged back per signature, the windows then cover what the validation oracle does. A signature
+        # without any link thus gets the whole oracle entry in each window rather than empty targets.
+        unlinked_traces = [extract_file_line_from_traces(traces, self.empty_and_comment_lines) for traces in unlinked_threads]
+        return [
+            {"|".join(log.get_log_statement() for log in window): string_traces(union_traces(traces + unlinked_traces))}
+            for window, traces in zip(windows, window_traces)
+        ]
 
     def make_validation_oracle(self, trace_manager: TraceManager):
         oracle = {}
         for signature in self.validation_signatures:
-            oracle[signature] = {}
-            for thread_id, traces in trace_manager.get_traces_by_signature(signature).items():
-                file_line = extract_file_line_from_traces(traces, self.empty_and_comment_lines)
-                oracle[signature] = merge_traces(oracle[signature], file_line)
-            oracle[signature] = string_traces(oracle[signature])
+            oracle[signature] = self.oracle_entry(trace_manager.get_traces_by_signature(signature))
+        self.write_validation_oracle(oracle)
+
+    def oracle_entry(self, threads: dict) -> str:
+        return string_traces(union_traces(
+            extract_file_line_from_traces(traces, self.empty_and_comment_lines)
+            for traces in threads.values()
+        ))
+
+    def write_validation_oracle(self, oracle: dict[str, str]):
         with open(f"output/{self.project}_{self.registry}/bulk_validation_oracle.json", "w") as f:
             json.dump(oracle, f, indent=4)
\ No newline at end of file
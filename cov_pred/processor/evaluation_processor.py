@@ -1,14 +1,16 @@
 import json
+import numpy as np
 import os
 import csv
 from utils.evaluation import evaluate, format, evaluate_methods_level
-from utils.format_util import merge_traces, string_traces, set_methods
+from utils.format_util import union_traces, string_traces, set_methods
 from utils.java_util import extract_all_class_and_method_info
+from utils.gpt import custom_id_signature
 from manager.application_log_manager import ApplicationLogManager
 
 class EvaluationProcessor:
 
-    def __init__(self, project: str, registry: str, empty_and_comment_lines: dict[str, list[int]]):
+    def __init__(self, project: str, registry: str, empty_and_comment_lines: dict[str, np.ndarray]):
         self.project = project
         self.registry = registry
         self.empty_and_comment_lines = empty_and_comment_lines
@@ -27,10 +29,11 @@ class EvaluationProcessor:
             answers = json.load(f)
         predictions = {}
         for prediction in raw_predictions:
-            signature = prediction["custom_id"].split("#")[0] + '#'
+            signature = custom_id_signature(prediction["custom_id"])
             if signature not in predictions:
-                predictions[signature] = {}
-            predictions[signature] = merge_traces(predictions[signature], format(prediction["response"]["body"]["choices"][0]["message"]["content"]))
+                predictions[signature] = []
+            predictions[signature].append(format(prediction["response"]["body"]["choices"][0]["message"]["content"]))
+        predictions = {signature: union_traces(formatted) for signature, formatted in predictions.items()}
 
         results = {}
         for signature in predictions.keys():
@@ -123,7 +126,7 @@ class EvaluationProcessor:
             answers = json.load(f)
         predictions = {}
         for prediction in raw_predictions:
-            signature = prediction["custom_id"].split("#")[0] + '#'
+            signature = custom_id_signature(prediction["custom_id"])
             if signature not in predictions:
                 predictions[signature] = set()
             predictions[signature].update(set_methods(prediction["response"]["body"]["choices"][0]["message"]["content"]))
@@ -160,13 +163,13 @@ class EvaluationProcessor:
         # First, merge all predictions for each signature
         line_predictions = {}
         for prediction in raw_predictions:
-            signature = prediction["custom_id"].split("#")[0] + '#'
+            signature = custom_id_signature(prediction["custom_id"])
             if signature not in line_predictions:
-                line_predictions[signature] = {}
-            line_predictions[signature] = merge_traces(
-                line_predictions[signature],
+                line_predictions[signature] = []
+            line_predictions[signature].append(
                 format(prediction["response"]["body"]["choices"][0]["message"]["content"], self.empty_and_comment_lines)
             )
+        line_predictions = {signature: union_traces(formatted) for signature, formatted in line_predictions.items()}
 
         # Convert merged line-level predictions to method-level
         predictions = {}
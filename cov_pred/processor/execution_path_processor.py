@@ -1,77 +1,165 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator
+from array import array
+import numpy as np
 from manager.trace_manager import TraceManager
 from manager.application_log_manager import ApplicationLogManager
+from entity.trace import ThreadPath, build_position_index, next_position, align_locations
+from utils.process_context import process_context
+
+
+def match_log_threads(log_threads: list[tuple[str, list[int | None]]], trace_threads: list[tuple[str, dict[int, array]]]) -> dict[str, tuple[str, list[int]]]:
+    # Each log thread goes to the first trace thread that executes its log locations in order, with the
+    # position of every log in that thread. Log threads without logs or without such a thread are left out.
+    matches = {}
+    for thread_id, location_ids in log_threads:
+        if not location_ids:
+            continue
+        required_location_ids = set(location_ids)
+        for thread_num, position_index in trace_threads:
+            # Threads missing any log location are rejected from the location set alone, before aligning
+            if not position_index.keys() >= required_location_ids:
+                continue
+            positions = align_locations(position_index, location_ids)
+            if positions is None:
+                continue
+            matches[thread_id] = (thread_num, link_positions(position_index, location_ids, positions))
+            break
+    return matches
+
+
+def link_positions(position_index: dict[int, array], location_ids: list[int | None], positions: list[int]) -> list[int]:
+    # Matching takes each log strictly after the previous log's trace, linking from that trace on. Both give the
+    # same positions as long as no two consecutive logs share a location; otherwise the logs are aligned again.
+    if all(location_ids[i] != location_ids[i+1] for i in range(len(location_ids)-1)):
+        return positions
+    positions = []
+    start = 0
+    for location_id in location_ids:
+        start = next_position(position_index, location_id, start)
+        positions.append(start)
+    return positions
+
+
+def match_signature(payload: tuple[str, list[tuple[str, list[int | None]]], list[tuple[str, np.ndarray]]]) -> tuple[str, dict[str, tuple[str, list[int]]]]:
+    # Process pool entry point: trace threads arrive as their arrays of location ids
+    signature, log_threads, trace_threads = payload
+    trace_threads = [(thread_num, build_position_index(location_ids.tolist())) for thread_num, location_ids in trace_threads]
+    return signature, match_log_threads(log_threads, trace_threads)
+
 
 class ExecutionPathProcessor:
-    def __init__(self, trace_manager: TraceManager, application_log_manager: ApplicationLogManager):
+    def __init__(self, trace_manager: TraceManager, application_log_manager: ApplicationLogManager, workers: int = 1):
         self.trace_manager = trace_manager
         self.application_log_manager = application_log_manager
+        self.workers = workers
         self.total = 0
         self.matched = 0
 
     def link_logs_to_execution_path(self):
-        thread_id_to_thread_num = self.check_link_logs_to_execution_path()
+        return dict(self.iter_links())
+
+    def iter_links(self, signatures: list[str] = None) -> Iterator[tuple[str, dict]]:
+        # (signature, {thread id: {(previous log, log): segment}}) one signature at a time, in the trace manager's
+        # order, so consumers never need the whole registry's collection; signatures restricts what is linked
+        for signature, matches in self.match_signatures(signatures):
+            yield signature, self.link_signature(signature, matches)
+
+    def link_signature(self, signature: str, matches: dict[str, tuple[str, list[int]]]) -> dict:
         collection = {}
-        for signature in self.trace_manager.get_signatures():
-            collection[signature] = {}
-            for thread_id, logs in self.application_log_manager.get_logs_by_signature(signature).items():
-                if thread_id not in thread_id_to_thread_num.get(signature, {}):
-                    continue
-                thread_num = thread_id_to_thread_num[signature][thread_id]
-                execution_path = self.trace_manager.get_traces_by_thread(signature, thread_num)
-                log_count = 0
-                collection[signature][thread_id] = {}
-                previous_log = ""
-                while log_count <= len(logs):
-                    if log_count == len(logs):
-                        collection[signature][thread_id][(previous_log, "")] = execution_path
-                        break
-                    
-                    log = logs[log_count]
-                    found = self.find_log_execution(log, execution_path)
-                    log_count += 1
-                    if found is None:
-                        continue
-                    executed_between_logs = execution_path[:found+1]
-                    collection[signature][thread_id][(previous_log, log)] = executed_between_logs
-                    previous_log = log
-                    execution_path = execution_path[found:]
+        for thread_id, logs in self.application_log_manager.get_logs_by_signature(signature).items():
+            if thread_id not in matches:
+                continue
+            thread_num, positions = matches[thread_id]
+            execution_path = self.trace_manager.get_traces_by_thread(signature, thread_num)
+            collection[thread_id] = {}
+            previous_log = ""
+            # Segments run from the previous log's trace to the current one's, both included
+            start = 0
+            for log, found in zip(logs, positions):
+                executed_between_logs = execution_path.segment(start, found+1)
+                collection[thread_id][(previous_log, log)] = executed_between_logs
+                previous_log = log
+                start = found
+            collection[thread_id][(previous_log, "")] = execution_path.segment(start, len(execution_path))
         return collection
 
-
-    def check_link_logs_to_execution_path(self) -> dict[str, str]:
-        signatures = self.trace_manager.get_signatures()
+    def check_link_logs_to_execution_path(self) -> dict[str, dict[str, str]]:
+        # Linking does not go through this: link_signature takes the positions from the same matches
         thread_id_to_thread_num = {}
-        thread_id_to_thread_num_length = {}
-        for signature in signatures:
-            for thread_id, logs in self.application_log_manager.get_logs_by_signature(signature).items():
-                for thread_num, execution_path in self.trace_manager.get_traces_by_signature(signature).items():
-                    if execution_path is None:
-                        continue
-                    if self.check_thread(logs, execution_path):
-                        if signature not in thread_id_to_thread_num:
-                            thread_id_to_thread_num[signature] = {}
-                            thread_id_to_thread_num_length[signature] = {}
-                        if len(logs) > thread_id_to_thread_num_length[signature].get(thread_id, 0):
-                            thread_id_to_thread_num[signature][thread_id] = thread_num
-                            self.matched += 1
-                            thread_id_to_thread_num_length[signature][thread_id] = len(logs)
+        for signature, matches in self.match_signatures():
+            if not matches:
+                continue
+            thread_id_to_thread_num[signature] = {thread_id: thread_num for thread_id, (thread_num, positions) in matches.items()}
         return thread_id_to_thread_num
 
+    def match_signatures(self, signatures: list[str] = None) -> Iterator[tuple[str, dict[str, tuple[str, list[int]]]]]:
+        if signatures is None:
+            signatures = self.trace_manager.get_signatures()
+        else:
+            selected = set(signatures)
+            signatures = [signature for signature in self.trace_manager.get_signatures() if signature in selected]
+        for signature, matches in self.iter_matches(signatures):
+            self.matched += len(matches)
+            yield signature, matches
+
+    def iter_matches(self, signatures: list[str]) -> Iterator[tuple[str, dict[str, tuple[str, list[int]]]]]:
+        if self.workers > 1:
+            # Signatures are independent: they are sharded across processes, which receive threads as location id
+            # arrays and return only the matches, so the heavy work of indexing the threads happens in the workers.
+            # Each payload carries its own locations, as the lazy load mode keeps adding paths to the table.
+            with ProcessPoolExecutor(max_workers=self.workers, mp_context=process_context()) as executor:
+                # A bounded window of signatures in flight keeps loading streamed instead of submitted at once
+                pending = deque()
+                for signature in signatures:
+                    pending.append(executor.submit(match_signature, self.get_payload(signature)))
+                    if len(pending) >= self.workers * 4:
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+            return
+        for signature in signatures:
+            # The indexes live only while this signature is matched
+            trace_threads = [(thread_num, execution_path.position_index()) for thread_num, execution_path in self.trace_manager.get_traces_by_signature(signature).items() if execution_path is not None]
+            yield signature, match_log_threads(self.get_log_threads(signature), trace_threads)
+
+    def get_payload(self, signature: str) -> tuple[str, list[tuple[str, list[int | None]]], list[tuple[str, np.ndarray]]]:
+        # Loading the traces first interns their paths (lazy mode), so the log locations below can be found
+        execution_paths = self.trace_manager.get_traces_by_signature(signature)
+        path_locations = np.frombuffer(self.trace_manager.path_table.path_locations, dtype=np.int32)
+        trace_threads = [(thread_num, path_locations[np.frombuffer(execution_path.path_ids, dtype=np.int32)]) for thread_num, execution_path in execution_paths.items() if execution_path is not None]
+        # The view must not outlive this call: the table's arrays cannot grow while a buffer is exported
+        del path_locations
+        return signature, self.get_log_threads(signature), trace_threads
+
+    def get_log_threads(self, signature: str) -> list[tuple[str, list[int | None]]]:
+        return [(thread_id, self.get_location_ids(logs)) for thread_id, logs in self.application_log_manager.get_logs_by_signature(signature).items()]
+
+    def get_location_ids(self, application_log) -> list[int | None]:
+        path_table = self.trace_manager.path_table
+        return [path_table.get_location_id(log.get_file(), log.get_line()) for log in application_log]
+
     def check_thread(self, application_log, execution_path) -> bool:
+        start = 0
+        # One index for all the logs of the thread, dropped once it is checked
+        position_index = execution_path.position_index() if isinstance(execution_path, ThreadPath) else None
         for log in application_log:
-            found = self.find_log_execution(log, execution_path)
+            found = self.find_log_execution(log, execution_path, start, position_index)
             if found is not None:
-                execution_path = execution_path[found+1:]
+                start = found + 1
                 continue
             return False
         return True
 
-    def find_log_execution(self, application_log, execution_path) -> int | None:
-        index = 0
-        for trace in execution_path:
+    def find_log_execution(self, application_log, execution_path, start: int = 0, position_index: dict[int, array] = None) -> int | None:
+        # Index of the first trace at or after start executing the log's file and line
+        if isinstance(execution_path, ThreadPath):
+            return execution_path.find(application_log.get_file(), application_log.get_line(), start, position_index)
+        for index in range(start, len(execution_path)):
+            trace = execution_path[index]
             if application_log.get_file() == trace.get_file() and application_log.get_line() == trace.get_line():
                 return index
-            index += 1
         return None
     
     def get_statistics(self):
@@ -1,55 +1,59 @@
 from sklearn.model_selection import train_test_split
-from utils.gpt import GPT
-from utils.format_util import merge_traces, string_traces, extract_file_line_from_traces, cut_prefix, make_jsonl, get_train_test_split
+from utils.gpt import GPT, BATCH_MAX_BYTES, BATCH_MAX_REQUESTS
+from utils.format_util import merge_traces, string_traces, union_traces, extract_file_line_from_traces, cut_prefix, make_jsonl, get_train_test_split
+from processor.training_patterns import describe_collection
 import json
+import numpy as np
+from typing import Iterable
+from functools import partial
 import os
 from manager.application_log_manager import ApplicationLogManager
 from manager.trace_manager import TraceManager
 
 
+def describe_lines(empty_and_comment_lines: dict[str, np.ndarray], executions) -> tuple[dict[str, np.ndarray], str]:
+    traces = extract_file_line_from_traces(executions, empty_and_comment_lines)
+    return traces, string_traces(traces)
+
+
 class FormatProcessor:
 
-    def __init__(self, project: str, registry: str, signatures_including_logs: list[str], gpt: GPT, empty_and_comment_lines: dict[str, list[int]], test_percentage=0.2, log_count_threshold=1):
+    def __init__(self, project: str, registry: str, signatures_including_logs: list[str], gpt: GPT, empty_and_comment_lines: dict[str, np.ndarray], test_percentage=0.2, log_count_threshold=1, compression=None, workers=1):
         self.project = project
         self.registry = registry
         self.test_percentage = test_percentage
         self.log_count_threshold = log_count_threshold
+        self.compression = compression
+        self.workers = workers
         self.signatures_including_logs = signatures_including_logs
         self.gpt = gpt
         self.validation_signatures = []
         self.empty_and_comment_lines = empty_and_comment_lines
         self.training_signatures, self.validation_signatures = get_train_test_split(self.project, self.registry, self.signatures_including_logs, test_size=self.test_percentage, random_state=42)
 
-    def format_for_training(self, collection):
+    def signatures_to_link(self) -> list[str]:
+        return self.training_signatures
+
+    def format_for_training(self, collection: Iterable[tuple[str, dict]]):
         formatted_collection = {}
-        seen_patterns = set()  # 重複パターンを追跡するためのセット
+        seen_patterns = set()  # 重複パターンを追跡するためのセット (64-bit pattern keys)
 
-        for signature, threads_collection in collection.items():
+        # Signatures are linked as they are consumed, so only the current one's segments are held.
+        # Pairs arrive described, in collection order, so the deduplication below is the same with any number of workers.
+        for signature, threads in describe_collection(collection, partial(describe_lines, self.empty_and_comment_lines), self.workers):
             formatted_collection[signature] = {}
-            for thread_id, logs_executions in threads_collection.items():
+            for thread_id, pair_count, pairs in threads:
                 formatted_collection[signature][thread_id] = []
                 count = 0
                 logs = []
                 merged_traces = {}
 
-                for (prev_log, curr_log), executions in logs_executions.items():
+                for pair in pairs:
                     count += 1
-                    traces = extract_file_line_from_traces(executions, self.empty_and_comment_lines)
-                    previous_statement = prev_log.get_log_statement() if prev_log != "" else ""
-                    current_statement = curr_log.get_log_statement() if curr_log != "" else ""
-                    if len(previous_statement) > 2000 or len(current_statement) > 2000:
+                    if pair is None:
                         count -= 1
                         continue
-
-                    # prev_logとcurr_logのファイル名と行数を取得
-                    prev_file = prev_log.get_file() if prev_log != "" else None
-                    prev_line = prev_log.get_line() if prev_log != "" else None
-                    curr_file = curr_log.get_file() if curr_log != "" else None
-                    curr_line = curr_log.get_line() if curr_log != "" else None
-
-                    # パターンの一意性を確認するためのキーを作成
-                    traces_str = string_traces(traces)
-                    pattern_key = (prev_file, prev_line, curr_file, curr_line, traces_str)
+                    pattern_key, formatted_previous_log, formatted_current_log, traces = pair
 
                     # 重複パターンをチェック
                     if pattern_key in seen_patterns:
@@ -61,15 +65,11 @@ class FormatProcessor:
                     # 新しいパターンを記録
                     seen_patterns.add(pattern_key)
 
-                    formatted_previous_log = cut_prefix(previous_statement, "START")
-                    formatted_current_log = cut_prefix(current_statement, "END")
-
-
                     if count == 1:
                         logs.append(formatted_previous_log)
                     logs.append(formatted_current_log)
                     merged_traces = merge_traces(merged_traces, traces)
-                    if count == len(logs_executions.keys()):
+                    if count == pair_count:
                         formatted_collection[signature][thread_id].append({
                             f'{"|||".join(logs)}': string_traces(merged_traces)
                         })
@@ -85,7 +85,7 @@ class FormatProcessor:
             for thread_id, items in threads_collection.items():
                 if signature in self.training_signatures:
                     training_data.extend(self.gpt.format_for_gpt_training(item) for item in items)
-        make_jsonl(training_data, f"output/{self.project}_{self.registry}/training.jsonl")
+        make_jsonl(training_data, f"output/{self.project}_{self.registry}/training.jsonl", compression=self.compression)
 
     def format_for_validation(self, application_log_manager: ApplicationLogManager, model: str):
         validation_input = []
@@ -110,15 +110,20 @@ class FormatProcessor:
                     validation_input.append(self.gpt.format_for_gpt_validation(input_data, signature, id_for_validation, model))
                     previous_log = input_current_statement
                     log_count += 1
-        make_jsonl(validation_input, f"output/{self.project}_{self.registry}/validation.jsonl")
+        make_jsonl(validation_input, f"output/{self.project}_{self.registry}/validation.jsonl", compression=self.compression, max_bytes=BATCH_MAX_BYTES, max_requests=BATCH_MAX_REQUESTS)
 
     def make_validation_oracle(self, trace_manager: TraceManager):
         oracle = {}
         for signature in self.validation_signatures:
-            oracle[signature] = {}
-            for thread_id, traces in trace_manager.get_traces_by_signature(signature).items():
-                file_line = extract_file_line_from_traces(traces, self.empty_and_comment_lines)
-                oracle[signature] = merge_traces(oracle[signature], file_line)
-            oracle[signature] = string_traces(oracle[signature])
+            oracle[signature] = self.oracle_entry(trace_manager.get_traces_by_signature(signature))
+        self.write_validation_oracle(oracle)
+
+    def oracle_entry(self, threads: dict) -> str:
+        return string_traces(union_traces(
+            extract_file_line_from_traces(traces, self.empty_and_comment_lines)
+            for traces in threads.values()
+        ))
+
+    def write_validation_oracle(self, oracle: dict[str, str]):
         with open(f"output/{self.project}_{self.registry}/validation_oracle.json", "w") as f:
             json.dump(oracle, f, indent=4)
\ No newline at end of file
@@ -1,53 +1,57 @@
 from sklearn.model_selection import train_test_split
 from utils.java_util import extract_class_and_method_info
-from utils.gpt import GPT
+from utils.gpt import GPT, BATCH_MAX_BYTES, BATCH_MAX_REQUESTS
 from utils.format_util import string_methods, extract_method_from_traces, cut_prefix, make_jsonl, get_train_test_split
 from manager.application_log_manager import ApplicationLogManager
 from manager.trace_manager import TraceManager
 from ordered_set import OrderedSet
 import json
+from typing import Iterable
+from functools import partial
+from processor.training_patterns import describe_collection
+
+
+def describe_methods(class_method_info, executions) -> tuple[OrderedSet, str]:
+    methods = extract_method_from_traces(executions, class_method_info)
+    return methods, string_methods(methods)
+
 
 class MethodLevelFormatProcessor:
-    def __init__(self, project: str, registry: str, signatures_including_logs: list[str], gpt: GPT, class_method_info, test_percentage=0.2, log_count_threshold=1):
+    def __init__(self, project: str, registry: str, signatures_including_logs: list[str], gpt: GPT, class_method_info, test_percentage=0.2, log_count_threshold=1, compression=None, workers=1):
         self.project = project
         self.registry = registry
         self.test_percentage = test_percentage
         self.log_count_threshold = log_count_threshold
+        self.compression = compression
+        self.workers = workers
         self.signatures_including_logs = signatures_including_logs
         self.gpt = gpt
         self.class_method_info = class_method_info
         self.training_signatures, self.validation_signatures = get_train_test_split(self.project, self.registry,self.signatures_including_logs, test_size=self.test_percentage, random_state=42)
 
-    def format_for_training(self, collection):
+    def signatures_to_link(self) -> list[str]:
+        return self.training_signatures
+
+    def format_for_training(self, collection: Iterable[tuple[str, dict]]):
         formatted_collection = {}
-        seen_patterns = set()  # 重複パターンを追跡するためのセット
+        seen_patterns = set()  # 重複パターンを追跡するためのセット (64-bit pattern keys)
 
-        for signature, threads_collection in collection.items():
+        # Signatures are linked as they are consumed, so only the current one's segments are held.
+        # Pairs arrive described, in collection order, so the deduplication below is the same with any number of workers.
+        for signature, threads in describe_collection(collection, partial(describe_methods, self.class_method_info), self.workers):
             formatted_collection[signature] = {}
-            for thread_id, logs_executions in threads_collection.items():
+            for thread_id, pair_count, pairs in threads:
                 formatted_collection[signature][thread_id] = []
                 count = 0
                 logs = []
                 total_methods = OrderedSet()
 
-                for (prev_log, curr_log), executions in logs_executions.items():
+                for pair in pairs:
                     count += 1
-                    methods = extract_method_from_traces(executions, self.class_method_info)
-                    previous_statement = prev_log.get_log_statement() if prev_log != "" else ""
-                    current_statement = curr_log.get_log_statement() if curr_log != "" else ""
-                    if len(previous_statement) > 2000 or len(current_statement) > 2000:
+                    if pair is None:
                         count -= 1
                         continue
-
-                    # prev_logとcurr_logのファイル名と行数を取得
-                    prev_file = prev_log.get_file() if prev_log != "" else None
-                    prev_line = prev_log.get_line() if prev_log != "" else None
-                    curr_file = curr_log.get_file() if curr_log != "" else None
-                    curr_line = curr_log.get_line() if curr_log != "" else None
-
-                    # パターンの一意性を確認するためのキーを作成
-                    methods_str = string_methods(methods)
-                    pattern_key = (prev_file, prev_line, curr_file, curr_line, methods_str)
+                    pattern_key, formatted_previous_log, formatted_current_log, methods = pair
 
                     # 重複パターンをチェック
                     if pattern_key in seen_patterns:
@@ -59,15 +63,11 @@ class MethodLevelFormatProcessor:
                     # 新しいパターンを記録
                     seen_patterns.add(pattern_key)
 
-                    formatted_previous_log = cut_prefix(previous_statement, "START")
-                    formatted_current_log = cut_prefix(current_statement, "END")
-
-
                     if count == 1:
                         logs.append(formatted_previous_log)
                     logs.append(formatted_current_log)
                     total_methods.update(methods)
-                    if count == len(logs_executions.keys()):
+                    if count == pair_count:
                         formatted_collection[signature][thread_id].append({
                             f'{"|||".join(logs)}': string_methods(total_methods)
                         })
@@ -83,7 +83,7 @@ class MethodLevelFormatProcessor:
             for thread_id, items in threads_collection.items():
                 if signature in self.training_signatures:
                     training_data.extend(self.gpt.format_for_gpt_training(item) for item in items)
-        make_jsonl(training_data, f"output/{self.project}_{self.registry}/method_level_training.jsonl")
+        make_jsonl(training_data, f"output/{self.project}_{self.registry}/method_level_training.jsonl", compression=self.compression)
 
     def format_for_validation(self, application_log_manager: ApplicationLogManager, model: str):
         validation_input = []
@@ -108,15 +108,20 @@ class MethodLevelFormatProcessor:
                     validation_input.append(self.gpt.format_for_gpt_validation(input_data, signature, id_for_validation, model))
                     previous_log = input_current_statement
                     log_count += 1
-        make_jsonl(validation_input, f"output/{self.project}_{self.registry}/method_level_validation.jsonl")
+        make_jsonl(validation_input, f"output/{self.project}_{self.registry}/method_level_validation.jsonl", compression=self.compression, max_bytes=BATCH_MAX_BYTES, max_requests=BATCH_MAX_REQUESTS)
 
     def make_validation_oracle(self, trace_manager: TraceManager):
         oracle = {}
         for signature in self.validation_signatures:
-            oracle[signature] = set()
-            for thread_id, traces in trace_manager.get_traces_by_signature(signature).items():
-                methods = extract_method_from_traces(traces, self.class_method_info)
-                oracle[signature].update(methods)
-            oracle[signature] = string_methods(oracle[signature])
+            oracle[signature] = self.oracle_entry(trace_manager.get_traces_by_signature(signature))
+        self.write_validation_oracle(oracle)
+
+    def oracle_entry(self, threads: dict) -> str:
+        methods = set()
+        for thread_id, traces in threads.items():
+            methods.update(extract_method_from_traces(traces, self.class_method_info))
+        return string_methods(methods)
+
+    def write_validation_oracle(self, oracle: dict[str, str]):
         with open(f"output/{self.project}_{self.registry}/method_level_validation_oracle.json", "w") as f:
             json.dump(oracle, f, indent=4)
\ No newline at end of file
@@ -0,0 +1,91 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator
+from utils.fingerprint import location_key, fingerprint
+from utils.format_util import cut_prefix, file_lines
+from utils.process_context import process_context
+
+# Longest log statement kept in training data
+MAX_STATEMENT_LENGTH = 2000
+
+
+class FileLines(list):
+    # Distinct (file, line) pairs of a segment, taken before it is sent to a formatting process
+    # so that the process does not need the thread or the PathTable behind it
+
+    def unique_file_lines(self) -> list[tuple[str, int]]:
+        return self
+
+
+def pattern_key(previous_location: tuple, current_location: tuple, executed: str) -> int:
+    # 64-bit key of a (previous log, log, executed code) pattern, the same in every process
+    return fingerprint([location_key(*previous_location), location_key(*current_location), executed.encode()])
+
+
+def log_location(log) -> tuple:
+    return (log.get_file(), log.get_line()) if log != "" else (None, None)
+
+
+def signature_payload(signature: str, threads_collection: dict) -> tuple[str, list]:
+    # Per thread: its id, its number of log pairs and, per pair, both statements, both locations and the executed lines
+    threads = []
+    for thread_id, logs_executions in threads_collection.items():
+        pairs = []
+        for (previous_log, current_log), executions in logs_executions.items():
+            previous_statement = previous_log.get_log_statement() if previous_log != "" else ""
+            current_statement = current_log.get_log_statement() if current_log != "" else ""
+            pairs.append((previous_statement, current_statement, log_location(previous_log), log_location(current_log), FileLines(file_lines(executions))))
+        threads.append((thread_id, len(logs_executions), pairs))
+    return signature, threads
+
+
+def describe_pair(pair: tuple, describe: Callable) -> tuple | None:
+    # (pattern key, formatted previous log, formatted log, executed code), or None for a pair with too long a statement
+    previous_statement, current_statement, previous_location, current_location, executions = pair
+    if len(previous_statement) > MAX_STATEMENT_LENGTH or len(current_statement) > MAX_STATEMENT_LENGTH:
+        return None
+    executed, executed_str = describe(executions)
+    key = pattern_key(previous_location, current_location, executed_str)
+    return key, cut_prefix(previous_statement, "START"), cut_prefix(current_statement, "END"), executed
+
+
+def describe_signature(payload: tuple[str, list], describe: Callable) -> tuple[str, list]:
+    signature, threads = payload
+    return signature, [(thread_id, pair_count, [describe_pair(pair, describe) for pair in pairs]) for thread_id, pair_count, pairs in threads]
+
+
+# Describe function of the processor, sent once to each formatting process with what it closes over
+worker_describe = None
+
+
+def init_worker(describe: Callable):
+    global worker_describe
+    worker_describe = describe
+
+
+def describe_signature_in_worker(payload: tuple[str, list]) -> tuple[str, list]:
+    return describe_signature(payload, worker_describe)
+
+
+def describe_collection(collection: Iterable[tuple[str, dict]], describe: Callable, workers: int = 1) -> Iterator[tuple[str, list]]:
+    """
+    Describe every log pair of a linked collection, one signature at a time and in collection order.
+
+    describe maps the executed traces of a pair to (executed code, its string). Everything that does not
+    depend on the patterns seen before is done here, so with workers > 1 it runs in worker processes;
+    the caller then only applies deduplication and grouping, in order, which keeps the output of a parallel
+    run identical to a serial one.
+    """
+    if workers <= 1:
+        for signature, threads_collection in collection:
+            yield describe_signature(signature_payload(signature, threads_collection), describe)
+        return
+    with ProcessPoolExecutor(max_workers=workers, mp_context=process_context(), initializer=init_worker, initargs=(describe,)) as executor:
+        # A bounded window of signatures in flight keeps the collection streamed instead of submitted at once
+        pending = deque()
+        for signature, threads_collection in collection:
+            pending.append(executor.submit(describe_signature_in_worker, signature_payload(signature, threads_collection)))
+            if len(pending) >= workers * 4:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
@@ -0,0 +1,134 @@
+import json
+import os
+import itertools
+import re
+import pyarrow as pa
+import pyarrow.parquet as pq
+from typing import Iterator
+from database import Database, DB_FETCH_SIZE
+from entity.trace_columns import TraceColumns
+
+# Column types are declared rather than inferred, so that every batch and every export agree
+TRACE_SCHEMA = pa.schema([
+    ("signature", pa.string()),
+    ("test_trace_id", pa.int64()),
+    ("thread_id", pa.int64()),
+    ("invoked_order", pa.int64()),
+    ("path", pa.string()),
+    ("position", pa.int64()),
+])
+LOG_SCHEMA = pa.schema([
+    ("signature", pa.string()),
+    ("invoked_order", pa.int64()),
+    ("statement", pa.string()),
+])
+
+
+def export_snapshot(database: Database, registry: str, snapshot_dir: str, batch_size=DB_FETCH_SIZE):
+    """Write a registry's commit id, signatures, traces and logs to Parquet files in snapshot_dir."""
+    os.makedirs(snapshot_dir, exist_ok=True)
+    metadata = {
+        "registry_id": str(registry),
+        "commit_id": database.get_commit_hash(registry),
+        "signatures": database.get_signatures(registry),
+    }
+    with open(os.path.join(snapshot_dir, "metadata.json"), "w") as f:
+        json.dump(metadata, f)
+    # Rows are written in database order, so loading from the snapshot yields exactly what the queries would
+    write_table(database.stream_execution_paths(registry, batch_size), TRACE_SCHEMA, os.path.join(snapshot_dir, "traces.parquet"), batch_size)
+    write_table(database.stream_logs(registry, batch_size), LOG_SCHEMA, os.path.join(snapshot_dir, "logs.parquet"), batch_size)
+
+
+def write_table(rows, schema: pa.Schema, file_path: str, batch_size=DB_FETCH_SIZE):
+    # Each batch is a row group; as traces arrive grouped by signature, the statistics of a row group
+    # let readers skip it when filtering on another signature
+    rows = iter(rows)
+    with pq.ParquetWriter(file_path, schema, compression="zstd") as writer:
+        while True:
+            batch = [{column: row[column] for column in schema.names} for row in itertools.islice(rows, batch_size)]
+            if not batch:
+                break
+            writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+
+
+class Snapshot:
+    """
+    Read-only stand-in for Database that serves one registry from an exported snapshot directory.
+
+    Tables are read batch by batch, and the traces of one signature through a filter on it,
+    so the snapshot is never held in memory as a whole.
+    """
+
+    def __init__(self, snapshot_dir: str):
+        with open(os.path.join(snapshot_dir, "metadata.json")) as f:
+            metadata = json.load(f)
+        self.registry = metadata["registry_id"]
+        self.commit_id = metadata["commit_id"]
+        self.signatures = metadata["signatures"]
+        self.traces_path = os.path.join(snapshot_dir, "traces.parquet")
+        self.logs_path = os.path.join(snapshot_dir, "logs.parquet")
+
+    def check_registry(self, registry):
+        if str(registry) != self.registry:
+            raise ValueError(f"Snapshot is for registry {self.registry}, not {registry}")
+
+    def get_commit_hash(self, registry) -> str | None:
+        self.check_registry(registry)
+        return self.commit_id
+
+    def get_signatures(self, registry_id: str) -> list[str]:
+        self.check_registry(registry_id)
+        return list(self.signatures)
+
+    def get_logs(self, registry) -> list[dict[str, str]]:
+        return list(self.stream_logs(registry))
+
+    def get_execution_path(self, registry, signature) -> list[dict[str, str]]:
+        return list(self.stream_execution_path(registry, signature))
+
+    def get_execution_paths(self, registry) -> list[dict[str, str]]:
+        return list(self.stream_execution_paths(registry))
+
+    def copy_execution_paths(self, registry) -> TraceColumns:
+        self.check_registry(registry)
+        columns = TraceColumns()
+        with pq.ParquetFile(self.traces_path) as traces:
+            for batch in traces.iter_batches(columns=TRACE_SCHEMA.names):
+                for row in zip(*batch.to_pydict().values()):
+                    columns.add_row(*row)
+        return columns
+
+    def stream_logs(self, registry, batch_size=DB_FETCH_SIZE, class_pattern=None, classes=None) -> Iterator[dict[str, str]]:
+        self.check_registry(registry)
+        logs = self.rows(self.logs_path, batch_size)
+        if classes is None:
+            return logs
+        # Same filter as LOGS_OF_CLASSES_QUERY, applied while reading
+        pattern = re.compile(class_pattern)
+        classes = set(classes)
+        return (log for log in logs if self.class_of(pattern, log["statement"]) in classes)
+
+    def class_of(self, pattern: re.Pattern, statement: str) -> str | None:
+        match = pattern.search(statement)
+        return match.group(1).replace("$", ".") if match else None
+
+    def stream_execution_path(self, registry, signature, batch_size=DB_FETCH_SIZE) -> Iterator[dict[str, str]]:
+        self.check_registry(registry)
+        # Rows keep the database order, which the filter preserves
+        return iter(pq.read_table(self.traces_path, filters=[("signature", "==", signature)]).to_pylist())
+
+    def stream_execution_paths(self, registry, batch_size=DB_FETCH_SIZE) -> Iterator[dict[str, str]]:
+        self.check_registry(registry)
+        return self.rows(self.traces_path, batch_size)
+
+    def fetch_execution_paths(self, registry, signatures: list[str], workers=1) -> Iterator[tuple[str, list[dict[str, str]]]]:
+        for signature in signatures:
+            yield signature, self.get_execution_path(registry, signature)
+
+    def rows(self, file_path: str, batch_size=DB_FETCH_SIZE) -> Iterator[dict[str, str]]:
+        with pq.ParquetFile(file_path) as table:
+            for batch in table.iter_batches(batch_size=batch_size):
+                yield from batch.to_pylist()
+
+    def close_conn(self):
+        pass
@@ -1,5 +1,7 @@
 import json
 import os
+import numpy as np
+from utils.format_util import is_empty_line
 
 def evaluate(pred, ans, empty_and_comment_lines=None):
     print("pred")
@@ -23,7 +25,7 @@ def format(data, empty_and_comment_lines={}):
             continue
         file_name, lines = file_line.split(":")
         file_name = file_name.strip()
-        empty_and_comment_line = file_empty_comment_lines.get(file_name, [])
+        empty_and_comment_line = file_empty_comment_lines.get(file_name)
         int_lines = []
         for line in lines.split(","):
             try:
@@ -31,16 +33,12 @@ def format(data, empty_and_comment_lines={}):
                     start, end = line.split("-")
                     if int(end) > 100000:
                         continue
-                    for i in range(int(start), int(end)+1):
-                        if i in empty_and_comment_line:
-                            continue
-                        int_lines.append(i)
+                    range_lines = np.arange(int(start), int(end)+1)
                 else:
-                    if int(line) in empty_and_comment_line:
-                        continue
-                    int_lines.append(int(line))
+                    range_lines = np.array([int(line)])
             except:
                 continue
+            int_lines.extend(range_lines[~is_empty_line(empty_and_comment_line, range_lines)].tolist())
         if file_name in formatted:
             formatted[file_name].extend(int_lines)
             formatted[file_name] = list(set(formatted[file_name]))
@@ -54,8 +52,9 @@ def calc_recall(formatted_pred, formatted_ans):
     right_pred = 0
     for ans_file_name, ans_lines in formatted_ans.items():
         if ans_file_name in formatted_pred:
+            pred_lines = set(formatted_pred[ans_file_name])
             for ans_line in ans_lines:
-                if ans_line in formatted_pred[ans_file_name]:
+                if ans_line in pred_lines:
                     right_pred+=1
                 all_lines+=1
         else:
@@ -69,8 +68,9 @@ def calc_precision(formatted_pred, formatted_ans):
     right_pred = 0
     for pred_file_name, pred_lines in formatted_pred.items():
         if pred_file_name in formatted_ans:
+            ans_lines = set(formatted_ans[pred_file_name])
             for pred_line in pred_lines:
-                if pred_line in formatted_ans[pred_file_name]:
+                if pred_line in ans_lines:
                     right_pred+=1
                 all_lines+=1
         else:
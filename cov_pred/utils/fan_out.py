@@ -0,0 +1,63 @@
+import queue
+import threading
+from typing import Callable, Iterable, Iterator
+
+# Marks the end of the items in a consumer's queue
+END = object()
+# Ends a consumer's queue when the producer failed, so that the consumer fails too instead of
+# completing its work on part of the items
+ABORT = object()
+
+
+def fan_out(items: Iterable, consumers: list[Callable[[Iterable], None]], buffer_size: int = 2):
+    """
+    Pass the items of a single iteration to several consumers, each of which takes an iterable.
+
+    Every consumer runs in its own thread and reads from a queue holding at most buffer_size items,
+    so the items are produced once and streamed, never held all at once. The first exception raised
+    by a consumer is raised again once every consumer has finished. If producing the items fails,
+    the consumers' reads raise instead of ending, and the producer's exception is raised again.
+    """
+    queues = [queue.Queue(maxsize=buffer_size) for _ in consumers]
+    errors = []
+
+    def run(consumer: Callable[[Iterable], None], items_queue: queue.Queue):
+        ended = False
+
+        def read() -> Iterator:
+            nonlocal ended
+            while True:
+                item = items_queue.get()
+                if item is END or item is ABORT:
+                    ended = True
+                    if item is ABORT:
+                        raise RuntimeError("The items were not all produced")
+                    return
+                yield item
+
+        try:
+            consumer(read())
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            # A consumer that stops early must not leave the producer blocked on its full queue
+            while not ended:
+                item = items_queue.get()
+                ended = item is END or item is ABORT
+
+    threads = [threading.Thread(target=run, args=(consumer, items_queue)) for consumer, items_queue in zip(consumers, queues)]
+    for thread in threads:
+        thread.start()
+    end = ABORT
+    try:
+        for item in items:
+            for items_queue in queues:
+                items_queue.put(item)
+        end = END
+    finally:
+        for items_queue in queues:
+            items_queue.put(end)
+        for thread in threads:
+            thread.join()
+    if errors:
+        raise errors[0]
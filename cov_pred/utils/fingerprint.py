@@ -0,0 +1,29 @@
+import hashlib
+from typing import Callable, Iterable
+
+
+def location_key(file: str | None, line: int | str | None) -> bytes:
+    return f"{file}:{line}\n".encode()
+
+
+def fingerprint(keys: Iterable[bytes]) -> int:
+    # 64-bit digest of a sequence of location keys; unlike hash() it is the same in every process and run
+    return int.from_bytes(hashlib.blake2b(b"".join(keys), digest_size=8).digest(), "big")
+
+
+def unique_threads(threads: dict, thread_fingerprint: Callable[[object], int], same_locations: Callable[[object, object], bool]) -> dict:
+    """
+    Keep the first of the threads that have the same (file, line) sequence, in one pass over the threads.
+
+    Threads are grouped by the fingerprint of that sequence. Threads with the same fingerprint are also
+    compared location by location, so a hash collision never drops a thread.
+    """
+    unique = {}
+    kept_by_fingerprint = {}
+    for thread, sequence in threads.items():
+        kept = kept_by_fingerprint.setdefault(thread_fingerprint(sequence), [])
+        if any(same_locations(sequence, other) for other in kept):
+            continue
+        kept.append(sequence)
+        unique[thread] = sequence
+    return unique
@@ -2,37 +2,47 @@ import os
 import json
 from ordered_set import OrderedSet
 import pathlib
+from typing import Iterable
+import numpy as np
+from utils.jsonl_writer import JsonlWriter
 from sklearn.model_selection import train_test_split
 
-def merge_traces(traces1: dict[str, list[int]], traces2: dict[str, list[int]]) -> dict[str, list[int]]:
+def line_array(lines) -> np.ndarray:
+    # Per-file coverage is kept as a sorted array of distinct line numbers
+    return np.unique(np.asarray(lines, dtype=np.int64))
+
+def merge_traces(traces1: dict[str, list[int]], traces2: dict[str, list[int]]) -> dict[str, np.ndarray]:
     merged = traces1.copy()
     for file, lines in traces2.items():
         if file not in merged:
-            merged[file] = lines
+            merged[file] = line_array(lines)
         else:
-            for line in lines:
-                if line not in merged[file]:
-                    merged[file].append(line)
-            merged[file] = sorted(merged[file])
+            merged[file] = np.union1d(merged[file], lines).astype(np.int64, copy=False)
     return merged
 
+def union_traces(traces_list: Iterable[dict[str, list[int]]]) -> dict[str, np.ndarray]:
+    # Merging many traces at once sorts each file's lines a single time instead of once per merge
+    file_lines = {}
+    for traces in traces_list:
+        for file, lines in traces.items():
+            if file not in file_lines:
+                file_lines[file] = []
+            file_lines[file].append(np.asarray(lines, dtype=np.int64))
+    return {file: np.unique(np.concatenate(arrays)) for file, arrays in file_lines.items()}
+
+def line_ranges(lines) -> tuple[np.ndarray, np.ndarray]:
+    # Start and end of each run of consecutive lines
+    lines = line_array(lines)
+    if len(lines) == 0:
+        return lines, lines
+    breaks = np.flatnonzero(np.diff(lines) != 1)
+    return lines[np.r_[0, breaks + 1]], lines[np.r_[breaks, len(lines) - 1]]
+
 def string_traces(traces: dict[str, list[int]]) -> str:
     result = []
     for file, lines in traces.items():
-        line_count = 0
-        file_line = []
-        while line_count < len(lines):
-            start_line = lines[line_count]
-            end_line = lines[line_count]
-            while line_count + 1 < len(lines) and end_line + 1 == lines[line_count + 1]:
-                end_line = lines[line_count + 1]
-                line_count += 1
-            if start_line == end_line:
-                line_count += 1
-                file_line.append(f"{start_line}")
-            else:
-                line_count += 1
-                file_line.append(f"{start_line}-{end_line}")
+        starts, ends = line_ranges(lines)
+        file_line = [f"{start}" if start == end else f"{start}-{end}" for start, end in zip(starts.tolist(), ends.tolist())]
         result.append(f"{file}:{','.join(file_line)}")
     return " | ".join(result)
 
@@ -44,37 +54,47 @@ def cut_prefix(log_statement: str, default: str) -> str:
             return log_statement[log_level_index:].strip()
     return default
 
-def extract_file_line_from_traces(traces: list, empty_and_comment_lines: dict[str, list[int]]) -> dict[str, list[int]]:
+def file_lines(traces) -> list[tuple[str, int]]:
+    # A ThreadPath yields its distinct (file, line) pairs without building a Trace per execution
+    if hasattr(traces, "unique_file_lines"):
+        return traces.unique_file_lines()
+    return [(trace.get_file(), int(trace.get_line())) for trace in traces]
+
+def is_empty_line(empty_mask: np.ndarray | None, lines: np.ndarray) -> np.ndarray:
+    # Lines past the end of the mask, or of a file without one, are not empty
+    if empty_mask is None:
+        return np.zeros(len(lines), dtype=bool)
+    inside = lines < len(empty_mask)
+    empty = np.zeros(len(lines), dtype=bool)
+    empty[inside] = empty_mask[lines[inside]]
+    return empty
+
+def fill_gaps(lines: np.ndarray, empty_mask: np.ndarray | None) -> np.ndarray:
+    # Adds the lines between two consecutive covered lines when all of them are empty or comments
+    if empty_mask is None or len(lines) < 2:
+        return lines
+    size = int(lines[-1]) + 1
+    # code_lines[i] counts the lines up to i that are neither empty nor comments
+    code_lines = np.cumsum(~is_empty_line(empty_mask, np.arange(size)))
+    starts, ends = lines[:-1], lines[1:]
+    filled = code_lines[ends - 1] == code_lines[starts]
+    bounds = np.bincount(starts[filled] + 1, minlength=size + 1) - np.bincount(ends[filled], minlength=size + 1)
+    return np.union1d(lines, np.flatnonzero(np.cumsum(bounds[:size]) > 0))
+
+def extract_file_line_from_traces(traces: list, empty_and_comment_lines: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
     result = {}
     return_result = {}
-    for trace in traces:
-        file = trace.get_file()
-        line = int(trace.get_line())
+    for file, line in file_lines(traces):
         if file not in result:
             result[file] = []
-        if line not in result[file]:
-            result[file].append(line)
+        result[file].append(line)
     for file, lines in result.items():
-        sorted_lines = sorted(lines)
-        for i in range(len(sorted_lines)-1):
-            empty_lines = empty_and_comment_lines.get(file, [])
-            add = True
-            added_lines = []
-            for j in range(sorted_lines[i]+1, sorted_lines[i+1]):
-                if j not in empty_lines:
-                    add = False
-                    break
-                added_lines.append(j)
-            if add:
-                sorted_lines.extend(added_lines)
-        return_result[file.split("/")[-1]] = sorted(list(set(sorted_lines)))
+        return_result[file.split("/")[-1]] = fill_gaps(line_array(lines), empty_and_comment_lines.get(file))
     return return_result
 
 def extract_method_from_traces(traces: list, class_method_info: dict[list[dict[str, str]]]):
     result = OrderedSet()
-    for trace in traces:
-        file = trace.get_file()
-        line = int(trace.get_line())
+    for file, line in file_lines(traces):
         if file in class_method_info:
             for method_info in class_method_info[file]["methods"]:
                 if method_info['start_line'] <= line <= method_info['end_line']:
@@ -84,11 +104,10 @@ def extract_method_from_traces(traces: list, class_method_info: dict[list[dict[s
 def string_methods(methods: set[str]) -> str:
     return " | ".join(list(methods))
 
-def make_jsonl(data, filename):
-    os.makedirs(os.path.dirname(filename), exist_ok=True)
-    with open(filename, "w") as f:
+def make_jsonl(data, filename, compression=None, max_bytes=None, max_requests=None):
+    with JsonlWriter(filename, compression=compression, max_bytes=max_bytes, max_requests=max_requests) as writer:
         for item in data:
-            f.write(json.dumps(item) + "\n")
+            writer.write(item)
 
 def set_methods(methods: str) -> set[str]:
     return set(map(str.strip, methods.split("|")))
@@ -1,4 +1,14 @@
 from openai import OpenAI
+from utils.jsonl_writer import read_manifest, shard_paths
+
+# Per-file limits of the Batch API; validation inputs are split into shards within them
+BATCH_MAX_REQUESTS = 50000
+BATCH_MAX_BYTES = 200 * 1024 * 1024
+
+
+def custom_id_signature(custom_id: str) -> str:
+    # Requests are identified as "{signature}-{id}"; the id has no '-', signatures may
+    return custom_id.rsplit("-", 1)[0]
 
 class GPT:
 
@@ -13,7 +23,10 @@ class GPT:
             file_path = f"output/{project}_{registry}/method_level_training.jsonl"
         elif level == "bulk":
             file_path = f"output/{project}_{registry}/bulk_training.jsonl"
-        training_file = self.upload_file(file_path, "fine-tune")
+        if read_manifest(file_path)["compression"] is not None:
+            raise ValueError(f"Compressed training file {file_path} is not supported")
+        # Training data is written as a single shard, found through its manifest
+        training_file = self.upload_file(shard_paths(file_path)[0], "fine-tune")
         suffix = f"{project}_{registry}_model"
         response = self.client.fine_tuning.jobs.create(training_file=training_file.id, model=model, suffix=suffix)
         print(response)
@@ -24,16 +37,20 @@ class GPT:
             file_path = f"output/{project}_{registry}/method_level_validation.jsonl"
         elif level == "bulk":
             file_path = f"output/{project}_{registry}/bulk_validation.jsonl"
-        validation_file = self.upload_file(file_path, "batch")
-        response = self.client.batches.create(
-            input_file_id=validation_file.id,
-            endpoint="/v1/chat/completions",
-            completion_window="24h",
-            metadata={
-                "description": f"Evaluation batch for {project}{registry}"
-            }
-        )
-        print(response)
+        if read_manifest(file_path)["compression"] is not None:
+            raise ValueError(f"Compressed batch input {file_path} is not supported")
+        # One batch per shard of the manifest written with the input
+        for shard_path in shard_paths(file_path):
+            validation_file = self.upload_file(shard_path, "batch")
+            response = self.client.batches.create(
+                input_file_id=validation_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h",
+                metadata={
+                    "description": f"Evaluation batch for {project}{registry}"
+                }
+            )
+            print(response)
 
     def upload_file(self, file_path, purpose):
         return self.client.files.create(file=open(file_path, "rb"), purpose=purpose)
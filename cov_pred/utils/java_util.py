@@ -3,6 +3,7 @@ import json
 import javalang
 from pathlib import Path
 import subprocess
+import numpy as np
 
 def extract_java_classes(directory_path):
     class_to_path = {}
@@ -209,7 +210,10 @@ def extract_empty_and_comment_lines(directory_path):
                         elif stripped_line.startswith('//') or stripped_line == '' or stripped_line == '{' or stripped_line == '}':
                             empty_comment_lines.append(i + 1)
                     
-                    file_to_empty_comment_lines[str(related_path)] = empty_comment_lines
+                    # Stored as a mask indexed by line number, so a lookup does not scan the list
+                    empty_comment_mask = np.zeros(len(lines) + 1, dtype=bool)
+                    empty_comment_mask[empty_comment_lines] = True
+                    file_to_empty_comment_lines[str(related_path)] = empty_comment_mask
                 
                 except Exception as e:
                     print(f"エラー: {file_path} の解析に失敗しました - {str(e)}")
@@ -0,0 +1,132 @@
+import glob
+import gzip
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIONS = {None: "", "gzip": ".gz", "zstd": ".zst"}
+# Buffer of each output file, so that lines reach the disk in large writes
+BUFFER_SIZE = 1 << 20
+
+
+def dumps(item) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(item) + b"\n"
+    return (json.dumps(item) + "\n").encode()
+
+
+def manifest_path(file_path: str) -> str:
+    return f"{os.path.splitext(file_path)[0]}.manifest.json"
+
+
+def read_manifest(file_path: str) -> dict:
+    # Files written before manifests existed are read as a single shard
+    if not os.path.exists(manifest_path(file_path)):
+        return {"compression": None, "shards": [{"file": os.path.basename(file_path)}]}
+    with open(manifest_path(file_path), "r") as f:
+        return json.load(f)
+
+
+def shard_paths(file_path: str) -> list[str]:
+    directory = os.path.dirname(file_path)
+    return [os.path.join(directory, shard["file"]) for shard in read_manifest(file_path)["shards"]]
+
+
+class JsonlWriter:
+    """
+    Write JSON lines to file_path, split into {stem}.part-NNN.jsonl shards of at most max_bytes
+    (uncompressed) and max_requests lines each, optionally compressed with gzip or zstd.
+
+    Output that fits in one shard keeps the plain file name. On close, {stem}.manifest.json lists
+    the shards with their line and byte counts.
+    """
+
+    def __init__(self, file_path: str, compression: str | None = None, max_bytes: int | None = None, max_requests: int | None = None):
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"{compression} compression is not supported")
+        # Checked before anything is removed, so a missing package never costs the previous output
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("zstd compression is not supported without the zstandard package")
+        self.file_path = file_path
+        self.compression = compression
+        self.max_bytes = max_bytes
+        self.max_requests = max_requests
+        self.stem, self.extension = os.path.splitext(file_path)
+        self.shards = []
+        self.file = None
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        self.remove_previous_output()
+
+    def remove_previous_output(self):
+        # Shards of an earlier, larger run would otherwise be left next to the new ones
+        for path in glob.glob(f"{glob.escape(self.stem)}.part-*{self.extension}*") + glob.glob(f"{glob.escape(self.file_path)}*"):
+            os.remove(path)
+
+    def shard_path(self, index: int) -> str:
+        return f"{self.stem}.part-{index:03d}{self.extension}{COMPRESSIONS[self.compression]}"
+
+    def open_shard(self):
+        path = self.shard_path(len(self.shards))
+        if self.compression == "gzip":
+            self.file = gzip.open(path, "wb", compresslevel=6)
+        elif self.compression == "zstd":
+            self.file = zstandard.ZstdCompressor().stream_writer(open(path, "wb", buffering=BUFFER_SIZE), closefd=True)
+        else:
+            self.file = open(path, "wb", buffering=BUFFER_SIZE)
+        self.shards.append({"file": path, "requests": 0, "bytes": 0})
+
+    def write(self, item):
+        line = dumps(item)
+        shard = self.shards[-1] if self.shards else None
+        if shard is None or self.is_full(shard, len(line)):
+            self.close_shard()
+            self.open_shard()
+            shard = self.shards[-1]
+        self.file.write(line)
+        shard["requests"] += 1
+        shard["bytes"] += len(line)
+
+    def is_full(self, shard: dict, size: int) -> bool:
+        # A shard always takes at least one line, even one larger than max_bytes
+        if shard["requests"] == 0:
+            return False
+        if self.max_requests is not None and shard["requests"] >= self.max_requests:
+            return True
+        return self.max_bytes is not None and shard["bytes"] + size > self.max_bytes
+
+    def close_shard(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def close(self):
+        if not self.shards:
+            self.open_shard()
+        self.close_shard()
+        if len(self.shards) == 1:
+            path = self.file_path + COMPRESSIONS[self.compression]
+            os.replace(self.shards[0]["file"], path)
+            self.shards[0]["file"] = path
+        manifest = {
+            "compression": self.compression,
+            "requests": sum(shard["requests"] for shard in self.shards),
+            "bytes": sum(shard["bytes"] for shard in self.shards),
+            "shards": [dict(shard, file=os.path.basename(shard["file"])) for shard in self.shards],
+        }
+        with open(manifest_path(self.file_path), "w") as f:
+            json.dump(manifest, f, indent=4)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,69 @@
+import json
+import re
+from typing import Iterable, NamedTuple
+
+LOG_FORMATS_PATH = "settings/log_formats.json"
+FIELDS = ["thread", "level", "class", "line"]
+
+
+class ParsedLog(NamedTuple):
+    thread_id: str | None
+    level: str | None
+    class_name: str | None
+    line: str | None
+
+
+class LogParser:
+    """
+    Parse log statements of one project with a regex compiled once from its entry in settings/log_formats.json.
+
+    An entry lists the log levels, the layouts of a statement as patterns with the groups thread, level,
+    class and line ({levels} stands for any of the levels), and a "location" pattern with the groups class
+    and line. All layouts are combined into one regex, so a statement following any of them is parsed by a
+    single search; other statements only get their class and line, from the location pattern.
+    """
+
+    parsers = {}
+
+    def __init__(self, spec: dict):
+        levels = "|".join(re.escape(level) for level in spec["levels"])
+        layouts = []
+        for i, layout in enumerate(spec["layouts"]):
+            # Group names must be unique in one regex, so each layout gets its own
+            layout = layout.replace("{levels}", levels)
+            for field in FIELDS:
+                layout = layout.replace(f"(?P<{field}>", f"(?P<{field}_{i}>")
+            layouts.append(layout)
+        self.pattern = re.compile("|".join(f"(?:{layout})" for layout in layouts), re.DOTALL)
+        self.location_pattern = re.compile(spec["location"], re.DOTALL)
+        # Positions of each layout's groups in match.groups(), in ParsedLog order
+        self.group_indices = [[self.pattern.groupindex[f"{field}_{i}"] - 1 for field in FIELDS] for i in range(len(layouts))]
+
+    @classmethod
+    def for_project(cls, project: str) -> 'LogParser':
+        if project not in cls.parsers:
+            with open(LOG_FORMATS_PATH) as f:
+                log_formats = json.load(f)
+            if project not in log_formats:
+                raise ValueError(f"{project} log format is not supported")
+            cls.parsers[project] = cls(log_formats[project])
+        return cls.parsers[project]
+
+    def parse(self, statement: str) -> ParsedLog:
+        match = self.pattern.search(statement)
+        if match is None:
+            location = self.location_pattern.search(statement)
+            if location is None:
+                return ParsedLog(None, None, None, None)
+            return ParsedLog(None, None, location.group("class").replace("$", "."), location.group("line"))
+        groups = match.groups()
+        for thread, level, class_name, line in self.group_indices:
+            if groups[level] is not None:
+                return ParsedLog(groups[thread], groups[level], groups[class_name].replace("$", "."), groups[line])
+
+    def parse_all(self, statements: Iterable[str]) -> list[ParsedLog]:
+        return [self.parse(statement) for statement in statements]
+
+    def class_pattern(self) -> str:
+        # The location pattern without group names, for databases whose regexes lack them; the class is group 1
+        return re.sub(r"\(\?P<\w+>", "(", self.location_pattern.pattern)
@@ -0,0 +1,9 @@
+import multiprocessing
+
+
+def process_context():
+    # Worker processes start from a clean server process instead of a fork of the caller, which may be running
+    # the consumer threads of fan_out: forking a multi-threaded process copies locks that other threads hold
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
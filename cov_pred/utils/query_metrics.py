@@ -0,0 +1,117 @@
+import functools
+import json
+import os
+import threading
+import time
+from typing import Iterator
+
+SLOW_QUERY_MS = os.getenv("DB_SLOW_QUERY_MS")
+
+
+class QueryMetrics:
+    # Aggregates time, row count and an estimate of the transferred bytes per Database method
+
+    def __init__(self, slow_query_ms: float | None = None):
+        self.lock = threading.Lock()
+        self.slow_query_ms = slow_query_ms
+        self.methods = {}
+        self.slow_queries = []
+
+    def record(self, method: str, params: tuple, seconds: float, rows: int, size: int):
+        with self.lock:
+            if method not in self.methods:
+                self.methods[method] = {"calls": 0, "seconds": 0.0, "max_seconds": 0.0, "rows": 0, "bytes": 0}
+            metrics = self.methods[method]
+            metrics["calls"] += 1
+            metrics["seconds"] += seconds
+            metrics["max_seconds"] = max(metrics["max_seconds"], seconds)
+            metrics["rows"] += rows
+            metrics["bytes"] += size
+            if self.slow_query_ms is not None and seconds * 1000 >= self.slow_query_ms:
+                # Parameters such as class lists can be huge, so only their beginning is kept
+                params = [str(param)[:200] for param in params]
+                self.slow_queries.append({"method": method, "params": params, "seconds": seconds, "rows": rows})
+                print(f"Slow query: {method}({', '.join(params)}) took {seconds:.3f}s for {rows} rows")
+
+    def summary(self) -> dict:
+        with self.lock:
+            return {
+                "total": {
+                    "calls": sum(metrics["calls"] for metrics in self.methods.values()),
+                    "seconds": sum(metrics["seconds"] for metrics in self.methods.values()),
+                    "rows": sum(metrics["rows"] for metrics in self.methods.values()),
+                    "bytes": sum(metrics["bytes"] for metrics in self.methods.values()),
+                },
+                "methods": self.methods,
+                "slow_query_ms": self.slow_query_ms,
+                "slow_queries": self.slow_queries,
+            }
+
+    def dump(self, file_path: str):
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w") as f:
+            json.dump(self.summary(), f, indent=4)
+
+
+query_metrics = QueryMetrics(float(SLOW_QUERY_MS) if SLOW_QUERY_MS else None)
+
+
+def estimate_size(value) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(estimate_size(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_size(item) for item in value)
+    if hasattr(value, "bytes_read"):
+        return value.bytes_read
+    return 8
+
+
+def count_rows(value) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, (str, dict)):
+        return 1
+    if hasattr(value, "__len__"):
+        return len(value)
+    return 1
+
+
+def instrumented(method):
+    """Record the duration, rows and bytes of a Database method in query_metrics, including streamed results."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        start = time.perf_counter()
+        result = method(self, *args, **kwargs)
+        seconds = time.perf_counter() - start
+        params = args + tuple(kwargs.values())
+        if isinstance(result, Iterator):
+            return metered(method.__name__, params, result, seconds)
+        query_metrics.record(method.__name__, params, seconds, count_rows(result), estimate_size(result))
+        return result
+    return wrapper
+
+
+def metered(method: str, params: tuple, rows: Iterator, seconds: float) -> Iterator:
+    # Only the time spent waiting for rows counts, not the time the consumer spends between them
+    count = 0
+    size = 0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                row = next(rows)
+            except StopIteration:
+                break
+            finally:
+                seconds += time.perf_counter() - start
+            count += 1
+            size += estimate_size(row)
+            yield row
+    finally:
+        if hasattr(rows, "close"):
+            rows.close()
+        query_metrics.record(method, params, seconds, count, size)
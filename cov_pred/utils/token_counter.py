@@ -0,0 +1,22 @@
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Encoding of the gpt-4o and gpt-4.1 model families
+DEFAULT_ENCODING = "o200k_base"
+
+
+class TokenCounter:
+    # Counts tokens of many texts in one call. Without tiktoken, the UTF-8 byte count is used instead:
+    # byte-level BPE never produces more tokens than bytes, so budgets hold, at the cost of smaller windows.
+
+    def __init__(self, encoding: str = DEFAULT_ENCODING):
+        self.encoding = tiktoken.get_encoding(encoding) if tiktoken is not None else None
+        if self.encoding is None:
+            print("tiktoken is not installed; token counts are bounded by UTF-8 byte counts")
+
+    def count_batch(self, texts: list[str]) -> list[int]:
+        if self.encoding is not None:
+            return [len(tokens) for tokens in self.encoding.encode_ordinary_batch(texts)]
+        return [len(text.encode()) for text in texts]
@@ -0,0 +1,34 @@
+import os
+from manager.application_log_manager import ApplicationLogManager
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLASS_TO_PATH = {"A": "src/main/A.java", "B": "src/main/B.java"}
+
+
+class FakeDatabase:
+
+    def __init__(self, rows: list[dict]):
+        self.rows = rows
+
+    def stream_logs(self, registry, class_pattern=None, classes=None):
+        return iter(self.rows)
+
+
+def row(thread: str, location: str, order: int) -> dict:
+    return {"signature": "test", "statement": f"INFO [{thread}:{location}] message", "invoked_order": order}
+
+
+def test_threads_are_compared_in_log_order(monkeypatch):
+    monkeypatch.chdir(REPOSITORY)
+    # Rows arrive in no particular order: t1 and t3 both log B then A, t2 logs A then B
+    rows = [
+        row("t1", "A@1", 2), row("t1", "B@2", 1),
+        row("t2", "A@1", 3), row("t2", "B@2", 4),
+        row("t3", "B@2", 5), row("t3", "A@1", 6),
+    ]
+    manager = ApplicationLogManager(FakeDatabase(rows), "registry", "zookeeper", CLASS_TO_PATH)
+    threads = manager.get_logs_by_signature("test")
+
+    assert list(threads) == ["t1", "t2"]
+    assert [log.get_class() for log in threads["t1"]] == ["B", "A"]
+    assert manager.get_fingerprint("test", "t1") != manager.get_fingerprint("test", "t2")
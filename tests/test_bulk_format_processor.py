@@ -0,0 +1,116 @@
+import json
+from entity.application_log import ApplicationLog
+from entity.trace import PathTable, ThreadPath
+from processor import bulk_format_processor
+from processor.bulk_format_processor import BulkFormatProcessor
+
+
+class WordCounter:
+    # Stands in for the tokenizer, whose encoding tiktoken would download
+
+    def count_batch(self, texts: list[str]) -> list[int]:
+        return [len(text.split()) for text in texts]
+
+
+class RecordingGPT:
+
+    def format_for_gpt_bulk_training(self, item: dict[str, str]) -> dict[str, str]:
+        return item
+
+
+class FakeApplicationLogManager:
+
+    def __init__(self, logs_by_signature: dict[str, dict[str, list]]):
+        self.logs_by_signature = logs_by_signature
+
+    def get_logs_by_signature(self, signature: str) -> dict[str, list]:
+        return self.logs_by_signature.get(signature, {})
+
+
+class FakeTraceManager:
+
+    def __init__(self, traces_by_signature: dict[str, dict[str, ThreadPath]]):
+        self.traces_by_signature = traces_by_signature
+
+    def get_traces_by_signature(self, signature: str) -> dict[str, ThreadPath]:
+        return self.traces_by_signature.get(signature, {})
+
+
+def make_thread(table: PathTable, thread_id: int, paths: list[str]) -> ThreadPath:
+    thread = ThreadPath(table, thread_id)
+    for order, path in enumerate(paths):
+        thread.append(path, order)
+    return thread
+
+
+def make_log(statement: str, order: int) -> ApplicationLog:
+    return ApplicationLog(statement, "project", order, {})
+
+
+def format_training(tmp_path, monkeypatch, logs_by_signature, traces_by_signature, collection) -> tuple[BulkFormatProcessor, list[dict]]:
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(bulk_format_processor, "TokenCounter", WordCounter)
+    (tmp_path / "output" / "project_registry").mkdir(parents=True)
+    with open(tmp_path / "output" / "project_registry" / "train_test_signature.json", "w") as f:
+        json.dump({"train": list(logs_by_signature), "test": []}, f)
+    # A budget of one token puts every log in a window of its own
+    processor = BulkFormatProcessor("project", "registry", list(logs_by_signature), RecordingGPT(), {}, FakeApplicationLogManager(logs_by_signature), FakeTraceManager(traces_by_signature), token_budget=1)
+    signatures_to_link = processor.signatures_to_link()
+    processor.format_for_training((signature, threads_collection) for signature, threads_collection in collection if signature in signatures_to_link)
+    with open(tmp_path / "output" / "project_registry" / "bulk_training.jsonl") as f:
+        return processor, [json.loads(line) for line in f]
+
+
+def test_unlinked_thread_traces_belong_to_every_window(tmp_path, monkeypatch):
+    table = PathTable()
+    linked = make_thread(table, 1, ["src/A.java;run@1", "src/A.java;run@2", "src/A.java;run@3", "src/A.java;run@4"])
+    unlinked = make_thread(table, 2, ["src/B.java;poll@7"])
+    first, second = make_log("first", 1), make_log("second", 2)
+    collection = [("windowed", {"t1": {
+        ("", first): linked.segment(0, 2),
+        (first, second): linked.segment(1, 3),
+        (second, ""): linked.segment(2, 4),
+    }})]
+    processor, training_data = format_training(
+        tmp_path, monkeypatch,
+        {"windowed": {"t1": [first, second]}},
+        {"windowed": {linked.thread_num: linked, unlinked.thread_num: unlinked}},
+        collection,
+    )
+
+    assert training_data == [{"first": "A.java:1-2 | B.java:7"}, {"second": "A.java:2-4 | B.java:7"}]
+    # Merged back, the windows cover the whole signature, as the validation oracle does
+    oracle = processor.oracle_entry({linked.thread_num: linked, unlinked.thread_num: unlinked})
+    assert oracle == "A.java:1-4 | B.java:7"
+
+
+def test_signature_without_links_gets_the_oracle_entry_in_every_window(tmp_path, monkeypatch):
+    table = PathTable()
+    thread = make_thread(table, 1, ["src/A.java;run@5", "src/A.java;run@6"])
+    first, second = make_log("first", 1), make_log("second", 2)
+    _, training_data = format_training(
+        tmp_path, monkeypatch,
+        {"unmatched": {"t1": [first, second]}},
+        {"unmatched": {thread.thread_num: thread}},
+        [],
+    )
+
+    assert training_data == [{"first": "A.java:5-6"}, {"second": "A.java:5-6"}]
+
+
+def test_only_windowed_signatures_are_linked(tmp_path, monkeypatch):
+    table = PathTable()
+    thread = make_thread(table, 1, ["src/A.java;run@1"])
+    logs_by_signature = {
+        "windowed": {"t1": [make_log("first", 1), make_log("second", 2)]},
+        "single": {"t1": [make_log("only", 1)]},
+    }
+    processor, training_data = format_training(
+        tmp_path, monkeypatch,
+        logs_by_signature,
+        {"windowed": {thread.thread_num: thread}, "single": {thread.thread_num: thread}},
+        [],
+    )
+
+    assert processor.signatures_to_link() == ["windowed"]
+    assert {"only": "A.java:1"} in training_data
@@ -0,0 +1,223 @@
+import random
+import pytest
+from entity.application_log import ApplicationLog
+from entity.trace import PathTable, ThreadPath
+from processor.execution_path_processor import ExecutionPathProcessor
+from utils.log_parser import ParsedLog
+
+CLASS_TO_PATH = {"A": "src/A.java", "B": "src/B.java"}
+
+
+class FakeTraceManager:
+
+    def __init__(self, traces_by_signature: dict[str, dict[str, ThreadPath]], path_table: PathTable):
+        self.traces_by_signature = traces_by_signature
+        self.path_table = path_table
+
+    def get_signatures(self) -> list[str]:
+        return list(self.traces_by_signature)
+
+    def get_traces_by_signature(self, signature: str) -> dict[str, ThreadPath]:
+        return self.traces_by_signature.get(signature, {})
+
+    def get_traces_by_thread(self, signature: str, thread_num: str) -> ThreadPath:
+        return self.traces_by_signature[signature][thread_num]
+
+
+class FakeApplicationLogManager:
+
+    def __init__(self, logs_by_signature: dict[str, dict[str, list]]):
+        self.logs_by_signature = logs_by_signature
+
+    def get_logs_by_signature(self, signature: str) -> dict[str, list]:
+        return self.logs_by_signature.get(signature, {})
+
+
+class PairwiseLinker:
+    # The linker before position indexes: every log thread is checked against every trace thread
+    # by scanning Trace objects, and linked by slicing the matched thread after each found log
+
+    def __init__(self, trace_manager: FakeTraceManager, application_log_manager: FakeApplicationLogManager):
+        self.trace_manager = trace_manager
+        self.application_log_manager = application_log_manager
+
+    def link_logs_to_execution_path(self) -> dict:
+        thread_id_to_thread_num = self.check_link_logs_to_execution_path()
+        collection = {}
+        for signature in self.trace_manager.get_signatures():
+            collection[signature] = {}
+            for thread_id, logs in self.application_log_manager.get_logs_by_signature(signature).items():
+                if thread_id not in thread_id_to_thread_num.get(signature, {}):
+                    continue
+                execution_path = list(self.trace_manager.get_traces_by_thread(signature, thread_id_to_thread_num[signature][thread_id]))
+                collection[signature][thread_id] = {}
+                previous_log = ""
+                for log in logs:
+                    found = self.find_log_execution(log, execution_path)
+                    collection[signature][thread_id][(previous_log, log)] = execution_path[:found+1]
+                    previous_log = log
+                    execution_path = execution_path[found:]
+                collection[signature][thread_id][(previous_log, "")] = execution_path
+        return collection
+
+    def check_link_logs_to_execution_path(self) -> dict[str, dict[str, str]]:
+        thread_id_to_thread_num = {}
+        for signature in self.trace_manager.get_signatures():
+            for thread_id, logs in self.application_log_manager.get_logs_by_signature(signature).items():
+                if not logs:
+                    continue
+                for thread_num, execution_path in self.trace_manager.get_traces_by_signature(signature).items():
+                    if self.check_thread(logs, list(execution_path)):
+                        thread_id_to_thread_num.setdefault(signature, {})[thread_id] = thread_num
+                        break
+        return thread_id_to_thread_num
+
+    def check_thread(self, logs: list, execution_path: list) -> bool:
+        for log in logs:
+            found = self.find_log_execution(log, execution_path)
+            if found is None:
+                return False
+            execution_path = execution_path[found+1:]
+        return True
+
+    def find_log_execution(self, log, execution_path: list) -> int | None:
+        for index, trace in enumerate(execution_path):
+            if log.get_file() == trace.get_file() and log.get_line() == trace.get_line():
+                return index
+        return None
+
+
+def make_log(class_name: str, line: int, order: int) -> ApplicationLog:
+    parsed = ParsedLog("t", "INFO", class_name, str(line))
+    return ApplicationLog(f"INFO {class_name}:{line} order {order}", "project", order, CLASS_TO_PATH, parsed=parsed)
+
+
+def make_thread(table: PathTable, thread_id: int, locations: list[tuple[str, int]]) -> ThreadPath:
+    thread = ThreadPath(table, thread_id)
+    for order, (class_name, line) in enumerate(locations):
+        thread.append(f"{CLASS_TO_PATH[class_name]};method@{line}", order)
+    return thread
+
+
+def random_location(rng: random.Random) -> tuple[str, int]:
+    # Few distinct locations, so that threads repeat them
+    return rng.choice(["A", "B"]), rng.randint(1, 6)
+
+
+def generate(seed: int) -> tuple[FakeTraceManager, FakeApplicationLogManager]:
+    rng = random.Random(seed)
+    table = PathTable()
+    traces_by_signature, logs_by_signature = {}, {}
+    order = 0
+    for signature_number in range(8):
+        signature = f"signature_{signature_number}"
+        threads = [[random_location(rng) for _ in range(rng.randint(0, 30))] for _ in range(rng.randint(1, 4))]
+        traces_by_signature[signature] = {}
+        for thread_id, locations in enumerate(threads):
+            thread = make_thread(table, thread_id, locations)
+            traces_by_signature[signature][thread.thread_num] = thread
+        logs_by_signature[signature] = {}
+        for log_thread in range(rng.randint(0, 4)):
+            source = rng.choice(threads)
+            kind = rng.random()
+            if kind < 0.5 and source:
+                # Logs at a subsequence of a thread, which may repeat a location back to back
+                positions = sorted(rng.sample(range(len(source)), rng.randint(1, min(len(source), 6))))
+                locations = [source[position] for position in positions]
+                if rng.random() < 0.3:
+                    locations.insert(rng.randrange(len(locations)), locations[rng.randrange(len(locations))])
+            else:
+                locations = [random_location(rng) for _ in range(rng.randint(0, 4))]
+            logs = []
+            for class_name, line in locations:
+                logs.append(make_log(class_name, line, order))
+                order += 1
+            logs_by_signature[signature][f"log_thread_{log_thread}"] = logs
+    return FakeTraceManager(traces_by_signature, table), FakeApplicationLogManager(logs_by_signature)
+
+
+def edge_cases() -> tuple[FakeTraceManager, FakeApplicationLogManager]:
+    table = PathTable()
+    repeated = make_thread(table, 1, [("A", 1), ("A", 2), ("A", 2), ("B", 3), ("A", 2)])
+    empty = make_thread(table, 2, [])
+    traces_by_signature = {
+        "repeated_locations": {repeated.thread_num: repeated},
+        "empty_thread": {empty.thread_num: empty, repeated.thread_num: repeated},
+        "no_match": {repeated.thread_num: repeated},
+    }
+    logs_by_signature = {
+        # Consecutive logs at the same location, found twice in the thread
+        "repeated_locations": {"t1": [make_log("A", 2, 0), make_log("A", 2, 1), make_log("B", 3, 2)], "t2": []},
+        "empty_thread": {"t1": [make_log("A", 1, 3)]},
+        # A location never traced, and a class without a file
+        "no_match": {"t1": [make_log("A", 9, 4)], "t2": [make_log("C", 1, 5)], "t3": [make_log("B", 3, 6), make_log("A", 1, 7)]},
+    }
+    return FakeTraceManager(traces_by_signature, table), FakeApplicationLogManager(logs_by_signature)
+
+
+def executed_locations(collection: dict) -> dict:
+    # Segments and slices compared by the (file, line) of every trace they hold
+    return {
+        signature: {
+            thread_id: {logs: [(trace.get_file(), trace.get_line()) for trace in executions] for logs, executions in logs_executions.items()}
+            for thread_id, logs_executions in threads_collection.items()
+        }
+        for signature, threads_collection in collection.items()
+    }
+
+
+INPUTS = [pytest.param(lambda seed=seed: generate(seed), id=f"generated-{seed}") for seed in range(6)] + [pytest.param(edge_cases, id="edge-cases")]
+
+
+@pytest.mark.parametrize("make_input", INPUTS)
+@pytest.mark.parametrize("workers", [1, 2])
+def test_links_match_pairwise_linker(make_input, workers):
+    trace_manager, application_log_manager = make_input()
+    baseline = PairwiseLinker(trace_manager, application_log_manager)
+    processor = ExecutionPathProcessor(trace_manager, application_log_manager, workers=workers)
+
+    assert executed_locations(processor.link_logs_to_execution_path()) == executed_locations(baseline.link_logs_to_execution_path())
+    assert processor.check_link_logs_to_execution_path() == baseline.check_link_logs_to_execution_path()
+
+
+def test_edge_cases_link_what_they_can():
+    trace_manager, application_log_manager = edge_cases()
+    processor = ExecutionPathProcessor(trace_manager, application_log_manager)
+    collection = executed_locations(processor.link_logs_to_execution_path())
+
+    first, second, third = application_log_manager.get_logs_by_signature("repeated_locations")["t1"]
+    assert collection["repeated_locations"] == {"t1": {
+        ("", first): [("src/A.java", "1"), ("src/A.java", "2")],
+        (first, second): [("src/A.java", "2")],
+        (second, third): [("src/A.java", "2"), ("src/A.java", "2"), ("src/B.java", "3")],
+        (third, ""): [("src/B.java", "3"), ("src/A.java", "2")],
+    }}
+    assert list(collection["empty_thread"]) == ["t1"]
+    assert collection["no_match"] == {}
+
+
+class CountingTraceManager(FakeTraceManager):
+
+    def __init__(self, traces_by_signature: dict[str, dict[str, ThreadPath]], path_table: PathTable):
+        super().__init__(traces_by_signature, path_table)
+        self.loaded = set()
+
+    def get_traces_by_signature(self, signature: str) -> dict[str, ThreadPath]:
+        self.loaded.add(signature)
+        return super().get_traces_by_signature(signature)
+
+
+def test_parallel_linking_loads_a_bounded_window_of_signatures():
+    table = PathTable()
+    traces_by_signature, logs_by_signature = {}, {}
+    for number in range(40):
+        thread = make_thread(table, 1, [("A", 1), ("A", 2)])
+        traces_by_signature[f"signature_{number}"] = {thread.thread_num: thread}
+        logs_by_signature[f"signature_{number}"] = {"t1": [make_log("A", 2, number)]}
+    trace_manager = CountingTraceManager(traces_by_signature, table)
+    processor = ExecutionPathProcessor(trace_manager, FakeApplicationLogManager(logs_by_signature), workers=2)
+
+    links = processor.iter_links()
+    next(links)
+    assert len(trace_manager.loaded) <= 2 * 4 + 1
+    assert len(list(links)) == 39
@@ -0,0 +1,45 @@
+import pytest
+from utils.fan_out import fan_out
+
+
+def produce(count: int, fail: bool):
+    for item in range(1, count + 1):
+        yield item
+    if fail:
+        raise ConnectionError("connection lost")
+
+
+def collecting_consumer(results: list, finished: list):
+    def consume(items):
+        results.append(list(items))
+        finished.append(True)
+    return consume
+
+
+def test_every_consumer_reads_every_item():
+    results, finished = [], []
+    fan_out(produce(5, fail=False), [collecting_consumer(results, finished) for _ in range(3)])
+
+    assert results == [[1, 2, 3, 4, 5]] * 3
+    assert len(finished) == 3
+
+
+def test_consumers_fail_when_the_producer_fails():
+    results, finished = [], []
+    with pytest.raises(ConnectionError):
+        fan_out(produce(2, fail=True), [collecting_consumer(results, finished) for _ in range(2)])
+
+    # No consumer gets to act on the items read before the failure
+    assert results == []
+    assert finished == []
+
+
+def test_consumer_error_is_raised():
+    def failing(items):
+        next(iter(items))
+        raise ValueError("bad item")
+
+    results, finished = [], []
+    with pytest.raises(ValueError):
+        fan_out(produce(50, fail=False), [failing, collecting_consumer(results, finished)])
+    assert results == [list(range(1, 51))]
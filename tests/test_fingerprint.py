@@ -0,0 +1,30 @@
+from entity.trace import PathTable, ThreadPath
+from utils.fingerprint import unique_threads
+
+
+def make_thread(table: PathTable, thread_id: int, paths: list[str]) -> ThreadPath:
+    thread = ThreadPath(table, thread_id)
+    for order, path in enumerate(paths):
+        thread.append(path, order)
+    return thread
+
+
+def test_first_of_equal_threads_is_kept():
+    table = PathTable()
+    threads = {
+        "thread_1": make_thread(table, 1, ["src/A.java;run@1", "src/A.java;run@2"]),
+        "thread_2": make_thread(table, 2, ["src/A.java;run@1", "src/A.java;run@2"]),
+        "thread_3": make_thread(table, 3, ["src/A.java;run@2", "src/A.java;run@1"]),
+    }
+
+    assert list(unique_threads(threads, ThreadPath.fingerprint, ThreadPath.same_locations)) == ["thread_1", "thread_3"]
+
+
+def test_colliding_fingerprints_keep_both_threads():
+    table = PathTable()
+    threads = {
+        "thread_1": make_thread(table, 1, ["src/A.java;run@1"]),
+        "thread_2": make_thread(table, 2, ["src/B.java;run@1"]),
+    }
+
+    assert list(unique_threads(threads, lambda thread: 0, ThreadPath.same_locations)) == ["thread_1", "thread_2"]
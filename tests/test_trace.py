@@ -0,0 +1,18 @@
+from entity.trace import PathTable, ThreadPath
+
+
+def make_thread(table: PathTable, thread_id: int, paths: list[str]) -> ThreadPath:
+    thread = ThreadPath(table, thread_id)
+    for order, path in enumerate(paths):
+        thread.append(path, order)
+    return thread
+
+
+def test_equal_threads_of_different_tables():
+    table, other_table = PathTable(), PathTable()
+    # The other table interns an unrelated path first, so the same paths get other ids
+    other_table.intern("src/C.java;other@9")
+    paths = ["src/A.java;run@1", "src/B.java;run@2"]
+
+    assert make_thread(table, 1, paths).equals(make_thread(other_table, 1, paths))
+    assert not make_thread(table, 1, paths).equals(make_thread(other_table, 1, paths[::-1]))